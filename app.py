@@ -1,84 +1,632 @@
-from flask import Flask, render_template_string, request, jsonify
-from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
-import random
 import os
+
+# One concurrency model for the whole process: the Socket.IO server, the
+# scheduler, background tasks and every lock follow the backend chosen
+# here (eventlet, gevent or threading). Monkey patching has to happen
+# before anything else imports socket or threading.
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'eventlet')
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+import atexit
+from collections import Counter
+from flask import Flask, request, jsonify
+from flask_socketio import SocketIO, emit, rooms
+from engineio import packet as eio_packet
+from socketio import packet as sio_packet
+import flask_socketio
+import hmac
+import logging
+import math
+import random
+import signal
 import string
+import sys
+import tempfile
+import threading
+import time
+import zlib
+import assets
+import engine
+import bots
+import jsonlog
+import metrics
+from bot_pool import BotPool, PENDING
+import sharding
+import wire
+from profiler import SamplingProfiler, native
+from room_actors import Mailboxes
+from room_store import RoomStore
+from event_log import EventLog
+from room_db import RoomDB
+from scheduler import Scheduler
+
+# Logs are JSON lines written by a background task (see jsonlog.py), with a
+# level per subsystem (LOG_LEVELS="ludo.rooms=WARNING,engineio=INFO") and
+# only a LOG_SAMPLE fraction of Socket.IO/Engine.IO packet logs kept
+jsonlog.setup(os.environ.get('LOG_LEVEL', 'INFO'), os.environ.get('LOG_LEVELS', ''),
+              float(os.environ.get('LOG_SAMPLE', '0.01')))
+log = logging.getLogger('ludo')
+rooms_log = logging.getLogger('ludo.rooms')
+game_log = logging.getLogger('ludo.game')
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # static/ is served by serve_asset()
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'ludo-secret-key-2025')
 
+class CountedPacket(sio_packet.Packet):
+    """Socket.IO packet that counts state updates in ludo_emits_total/ludo_emit_bytes_total as it encodes
+
+    A room emit is encoded once for all of its recipients, so this counts
+    once per room and format, with the UTF-8 size of what goes on the wire.
+    """
+    COUNTED = ('update_state', 'update_bin')
+    counted_as = None  # overrides the event name as the label, e.g. for spectator frames
+
+    def encode(self):
+        encoded = super().encode()
+        event = self.data[0] if self.packet_type in (sio_packet.EVENT, sio_packet.BINARY_EVENT) and self.data else None
+        if event in self.COUNTED:
+            label = self.counted_as or event
+            EMITS.inc(label)
+            EMIT_BYTES.inc(label, amount=sum(len(part.encode()) if isinstance(part, str) else len(part)
+                                             for part in (encoded if isinstance(encoded, list) else [encoded])))
+        return encoded
+
 # IMPORTANT: Production configuration for Render/Heroku/Railway
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
-    async_mode='threading',
-    logger=True,
-    engineio_logger=True,
+    async_mode=ASYNC_MODE,
+    logger=logging.getLogger('socketio'),
+    engineio_logger=logging.getLogger('engineio'),
+    serializer=CountedPacket,
     ping_timeout=60,
-    ping_interval=25
+    ping_interval=25,
+    **sharding.queue_options()
 )
 
-SAFE_POSITIONS = [0, 8, 13, 21, 26, 34, 39, 47]
+# Prometheus-style numbers served at /metrics (see metrics.py)
+HANDLER_SECONDS = metrics.Histogram('ludo_handler_seconds', "Socket.IO handler time, including room events it ran",
+                                    ('event',))
+EMITS = metrics.Counter('ludo_emits_total', "State updates emitted, once per room and format", ('event',))
+EMIT_BYTES = metrics.Counter('ludo_emit_bytes_total', "Payload bytes of those updates", ('event',))
+CONNECTIONS = metrics.Gauge('ludo_connections', "Connected Socket.IO clients")
+TASKS = metrics.Gauge('ludo_background_tasks', "Live background tasks", ('task',))
+BOT_DECISION_SECONDS = metrics.Histogram('ludo_bot_decision_seconds', "Time from a bot's roll to its worker's answer",
+                                         buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0))
+metrics.Gauge('ludo_rooms', "Rooms in memory by game mode", ('mode',),
+              collect=lambda: Counter(str(state.mode) for state in game_rooms.states()))
+metrics.Gauge('ludo_mailbox_busy', "Rooms running an event right now", collect=lambda: room_actors.metrics()['busy'])
+metrics.Gauge('ludo_bot_jobs', "Bot decisions in flight", collect=lambda: len(bot_pool))
+SPECTATOR_FRAMES = metrics.Counter('ludo_spectator_frames_total', "Spectator frames sent or skipped for backlog",
+                                   ('result',))
+metrics.Gauge('ludo_spectators', "Connected spectators", collect=lambda: len(spectators))
+
+def start_task(fn, *args):
+    """socketio.start_background_task, counted in ludo_background_tasks"""
+    name = fn.__qualname__
+    def run():
+        TASKS.inc(name)
+        try:
+            fn(*args)
+        finally:
+            TASKS.dec(name)
+    return socketio.start_background_task(run)
+
+# Everything that changes a room runs through the room's mailbox (see
+# room_actors.py): one event at a time per room, rooms in parallel, no
+# global lock. Mailbox events take the sid they act for, never `request`.
+room_actors = Mailboxes()
+
+# Every delayed game action (bot rolls and moves, passing the dice) is a
+# timer keyed by room code on one scheduler task; handlers never sleep.
+# Due timers run in their room's mailbox.
+scheduler = Scheduler(start_task, socketio.sleep, dispatch=room_actors.post)
+
+NO_MOVES_DELAY = 2.0     # "no valid moves" stays up before the dice pass on
+NEXT_TURN_DELAY = 1.2    # after a move, before the dice pass on
+EXTRA_TURN_DELAY = 1.5   # after a move that earned another roll
+BOT_HANDOFF_DELAY = 0.8  # after the dice pass to the bot
+BOT_ROLL_DELAY = 2.0     # before the bot rolls
+BOT_MOVE_DELAY = 1.8     # between the bot's roll and its move
+BOT_POLL_INTERVAL = 0.1  # re-check a bot decision that is still being worked out
+
+# Bot decisions above the easy level run in worker processes, started as
+# soon as the bot rolls; past BOT_TIMEOUT the simple heuristic moves instead
+BOT_TIMEOUT = float(os.environ.get('BOT_TIMEOUT', '3.0'))
+BOT_QUEUE = int(os.environ.get('BOT_QUEUE', '0')) or None
+bot_pool = BotPool(max_jobs=BOT_QUEUE, timeout=BOT_TIMEOUT, on_decision=BOT_DECISION_SECONDS.observe)
+
+# Rooms idle longer than ROOM_TTL seconds are swept every REAP_INTERVAL;
+# past MAX_ROOMS the least recently active room is evicted
+MAX_ROOMS = int(os.environ.get('MAX_ROOMS', '50000'))
+ROOM_TTL = float(os.environ.get('ROOM_TTL', '1800'))
+REAP_INTERVAL = float(os.environ.get('REAP_INTERVAL', '60'))
+reaper_started = False
+
+# Reverse index: socket sid -> (room_code, color) for the room it plays in.
+# LOCAL_ rooms are indexed with color None.
+session_rooms = {}
+
+# State changes are coalesced: broadcast_state() only marks a room dirty and
+# the flusher sends one update per room per tick. 0 sends immediately.
+BROADCAST_INTERVAL = float(os.environ.get('BROADCAST_INTERVAL', '0.05'))
+
+# Sessions that connected with auth={'wire': 'bin'} get update_bin (see
+# wire.py) instead of update_state. Every session is in its room plus a
+# per-format sub-room, so each update is encoded once per format and a
+# room with no binary clients never pays for the binary encoding.
+binary_sids = set()
+binary_rooms = set()
+
+# Spectators watch a room read-only and sit outside its player groups.
+# Every SPECTATOR_INTERVAL a changed room's full state is encoded once and
+# the same packets go to all of its spectators; one whose socket still has
+# more than SPECTATOR_BACKLOG packets queued skips frames until it drains.
+SPECTATOR_INTERVAL = float(os.environ.get('SPECTATOR_INTERVAL', '0.25'))
+SPECTATOR_BACKLOG = int(os.environ.get('SPECTATOR_BACKLOG', '8'))
+SPECTATOR_BATCH = 200  # sends between yields to player traffic
+spectators = {}        # sid -> watched room_code
+watchers = {}          # room_code -> spectator sids
+watch_dirty = set()    # watched rooms changed since their last frame
+fresh_frames = set()   # rooms whose latest frame hasn't gone out yet
+lagging = {}           # room_code -> spectators that skipped its latest frame
+frames = {}            # room_code -> latest encoded frame, per wire format
+watch_lock = threading.Lock()
+spectators_started = False
+
+# room_code -> log lines since that room's last broadcast
+dirty_rooms = {}
+dirty_lock = threading.Lock()
+flusher_started = False
+
+def forget_room(room_code, game_state, reason):
+    """Drop every other reference to a room that left the store"""
+    sids = list(game_state.player_sessions or ())
+    if room_code.startswith('LOCAL_'):
+        sids.append(room_code[len('LOCAL_'):])
+    for sid in sids:
+        if session_rooms.get(sid, (None, None))[0] == room_code:
+            del session_rooms[sid]
+    with dirty_lock:
+        dirty_rooms.pop(room_code, None)
+    scheduler.cancel(room_code)
+    bot_pool.cancel(room_code)
+    binary_rooms.discard(room_code)
+    if reason == 'evicted_idle':
+        room_db.forget(room_code)  # otherwise find_room() would bring it back
+    with watch_lock:
+        for sid in watchers.pop(room_code, ()):
+            spectators.pop(sid, None)
+        for pending in (watch_dirty, fresh_frames):
+            pending.discard(room_code)
+        lagging.pop(room_code, None)
+        frames.pop(room_code, None)
+    for name in (room_code, room_code + '~json', room_code + '~bin', room_code + '~watch'):
+        socketio.close_room(name)
+    if reason != 'closed':
+        rooms_log.info("room removed", extra={'room': room_code, 'reason': reason})
 
 # Global storage for game rooms
-game_rooms = {}
+game_rooms = RoomStore(MAX_ROOMS, ROOM_TTL, on_evict=forget_room)
+
+# Rolls, moves and turn changes of online rooms go to an append-only
+# binary log (see event_log.py) when EVENT_LOG names a file. With
+# DICE_SEED set, each room's dice are seeded from it and the room code,
+# so runs can be reproduced.
+event_log = EventLog(os.environ.get('EVENT_LOG'))
+DICE_SEED = os.environ.get('DICE_SEED')
+
+def run_native(fn, *args):
+    """fn(*args) on a real OS thread, so blocking I/O doesn't stall every green thread"""
+    if ASYNC_MODE == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    if ASYNC_MODE == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+# Online rooms are also written behind to SQLite when ROOM_DB names a file,
+# batched every ROOM_DB_INTERVAL seconds, and loaded back on first use
+room_db = RoomDB(os.environ.get('ROOM_DB'), offload=run_native, lock=native('_thread', 'allocate_lock')())
+ROOM_DB_INTERVAL = float(os.environ.get('ROOM_DB_INTERVAL', '2.0'))
+writer_started = False
+atexit.register(room_db.close)  # the last ROOM_DB_INTERVAL of changes; gunicorn.conf.py also calls it
+restore_lock = threading.Lock()
+
+def new_room(room_code):
+    """A fresh game state for room_code with its own dice"""
+    game_state = engine.create_game_state()
+    game_state.room_code = room_code
+    if DICE_SEED is not None:
+        game_state.dice = engine.Dice(int(DICE_SEED) ^ zlib.crc32(room_code.encode()))
+    return game_state
+
+PLAYER_COUNTS = (2, 4)
+
+def game_settings(data):
+    """(mode, num_players) from a client's request, or None if either is invalid
+
+    Both go into one-byte fields of the binary wire format and the event
+    log, so anything else is refused here instead of failing in an encoder.
+    """
+    mode = data.get('mode', 'multiplayer')
+    num_players = data.get('num_players', 4)
+    if mode not in wire.MODES[1:] or type(num_players) is not int or num_players not in PLAYER_COUNTS:
+        return None
+    return mode, num_players
+
+def start_reaper():
+    """Start the idle-room sweeper the first time a room is created"""
+    global reaper_started
+    if not reaper_started:
+        reaper_started = True
+        start_task(reaper_loop)
+
+def reaper_loop():
+    while True:
+        socketio.sleep(REAP_INTERVAL)
+        game_rooms.sweep()
+
+def start_writer():
+    """Start the room_db writer the first time a room needs saving"""
+    global writer_started
+    if room_db.path and not writer_started:
+        writer_started = True
+        start_task(writer_loop)
+
+def writer_loop():
+    while True:
+        socketio.sleep(ROOM_DB_INTERVAL)
+        try:
+            room_db.flush()
+        except Exception:
+            log.exception("saving rooms failed")
+
+def find_room(room_code):
+    """A room from memory, or loaded from room_db if a restart dropped it"""
+    game_state = game_rooms.get(room_code)
+    if game_state is not None or not room_code or not sharding.is_local(room_code):
+        return game_state
+    with restore_lock:
+        # a join and a lookup can both miss; only the first one loads the row
+        game_state = game_rooms.get(room_code)
+        if game_state is None:
+            game_state = restore_room(room_code)
+    return game_state
+
+def restore_room(room_code):
+    loaded = room_db.load(room_code)
+    if loaded is None:
+        return None
+    game_state, log_offset = loaded
+    # the row can be behind the event log; carry on after its last event,
+    # reading only what was logged since the row was packed
+    game_state.event_seq = max(game_state.event_seq, run_native(event_log.last_seq, room_code, log_offset))
+    if game_state.rolled_value is not None and not game_state.can_move:
+        engine.next_turn(game_state)  # its hand-over timer died with the old process
+        event_log.pass_turn(room_code, game_state)
+    event_log.snapshot(room_code, game_state)
+    if game_state.can_move:
+        game_state.log = f"♻️ GAME RESTORED - {game_state.turn.upper()} ROLLED {game_state.rolled_value}, CLICK A TOKEN TO MOVE!"
+    elif game_state.game_started:
+        game_state.log = f"♻️ GAME RESTORED - {game_state.turn.upper()}'s TURN - CLICK DICE TO ROLL!"
+    game_rooms[room_code] = game_state
+    start_reaper()
+    rooms_log.info("room restored", extra={'room': room_code})
+    return game_state
 
 def generate_room_code():
-    """Generate a unique 6-character room code"""
+    """Generate a unique 6-character room code owned by this shard"""
     while True:
         code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        if code not in game_rooms:
+        if code not in game_rooms and sharding.is_local(code):
             return code
 
-def create_game_state():
-    """Create a fresh game state"""
-    return {
-        'mode': None,
-        'num_players': 4,
-        'active_colors': [],
-        'user_color': None,
-        'turn': None,
-        'rolled_value': None,
-        'can_move': False,
-        'players': {
-            'red':    {'tokens': [-1, -1, -1, -1], 'path_start': 0},
-            'green':  {'tokens': [-1, -1, -1, -1], 'path_start': 13},
-            'yellow': {'tokens': [-1, -1, -1, -1], 'path_start': 26},
-            'blue':   {'tokens': [-1, -1, -1, -1], 'path_start': 39}
-        },
-        'log': "Waiting for game to start...",
-        'game_started': False,
-        'turn_order': [],
-        'room_code': None,
-        'player_sessions': {},
-        'connected_players': 0
-    }
+def broadcast_state(room_code):
+    """Queue a room's changes for the next coalesced broadcast"""
+    global flusher_started
+    game_state = game_rooms.peek(room_code)
+    if game_state is None:
+        return
+    room_db.mark(room_code, game_state, event_log.end)
+    start_writer()
+    
+    with dirty_lock:
+        events = dirty_rooms.setdefault(room_code, [])
+        if not events or events[-1] != game_state.log:
+            events.append(game_state.log)
+        start_flusher = BROADCAST_INTERVAL > 0 and not flusher_started
+        flusher_started = flusher_started or start_flusher
+    if room_code in watchers:
+        with watch_lock:
+            watch_dirty.add(room_code)
+    
+    if BROADCAST_INTERVAL <= 0:
+        # callers are already in the room's mailbox
+        with dirty_lock:
+            events = dirty_rooms.pop(room_code, [])
+        send_update(room_code, events)
+    elif start_flusher:
+        start_task(broadcast_loop)
+
+def flush_broadcasts():
+    """Send one update_state per dirty room with every log line it produced"""
+    with dirty_lock:
+        pending = dirty_rooms.copy()
+        dirty_rooms.clear()
+    
+    for room_code, events in pending.items():
+        room_actors.post(room_code, send_update, room_code, events)
+
+def send_update(room_code, events):
+    """Emit a room's delta to its players, once per wire format"""
+    game_state = game_rooms.peek(room_code)
+    if game_state is None:
+        return
+    update = game_state.delta()
+    if not update:
+        return
+    if len(events) > 1 and 'log' in update['patch']:
+        update['events'] = events
+    socketio.emit('update_state', update, to=room_code + '~json')
+    if room_code in binary_rooms:
+        socketio.emit('update_bin', wire.encode_update(update), to=room_code + '~bin')
+
+def broadcast_loop():
+    while True:
+        socketio.sleep(BROADCAST_INTERVAL)
+        flush_broadcasts()
+
+def send_snapshot(room_code, sid):
+    """Send the full room state to one client"""
+    game_state = game_rooms.peek(room_code)
+    if game_state is None:
+        return
+    snapshot = game_state.snapshot()
+    if sid in binary_sids:
+        socketio.emit('update_bin', wire.encode_update(snapshot), to=sid)
+    else:
+        socketio.emit('update_state', snapshot, to=sid)
+
+def enter_room(room_code, sid):
+    """Put a session in a room and its wire format's sub-room"""
+    socketio.server.enter_room(sid, room_code, namespace='/')
+    if sid in binary_sids:
+        socketio.server.enter_room(sid, room_code + '~bin', namespace='/')
+        binary_rooms.add(room_code)
+    else:
+        socketio.server.enter_room(sid, room_code + '~json', namespace='/')
+
+def exit_room(room_code, sid):
+    socketio.server.leave_room(sid, room_code, namespace='/')
+    socketio.server.leave_room(sid, room_code + ('~bin' if sid in binary_sids else '~json'), namespace='/')
+
+def encode_event(event, payload, counted_as=None):
+    """Engine.IO packets for one Socket.IO event, encoded once for any number of clients"""
+    pkt = socketio.server.packet_class(sio_packet.EVENT, namespace='/', data=[event, payload])
+    pkt.counted_as = counted_as
+    encoded = pkt.encode()
+    return [eio_packet.Packet(eio_packet.MESSAGE, part) for part in (encoded if isinstance(encoded, list) else [encoded])]
+
+def capture_frame(room_code):
+    """Encode a room's full state for its spectators, once per wire format"""
+    game_state = game_rooms.peek(room_code)
+    if game_state is None:
+        return
+    snapshot = game_state.snapshot()
+    with watch_lock:
+        binary = any(sid in binary_sids for sid in watchers.get(room_code, ()))
+    frame = {'json': encode_event('update_state', snapshot, 'spectator_frame')}
+    if binary:
+        frame['bin'] = encode_event('update_bin', wire.encode_update(snapshot), 'spectator_frame')
+    with watch_lock:
+        frames[room_code] = frame
+        fresh_frames.add(room_code)
+
+def fan_out(room_code, frame, only=None):
+    """Send a captured frame to a room's spectators (or just `only`), skipping backed-up ones"""
+    sent = 0
+    behind = set()
+    for sid, eio_sid in socketio.server.manager.get_participants('/', room_code + '~watch'):
+        if only is not None and sid not in only:
+            continue
+        sock = socketio.server.eio.sockets.get(eio_sid)
+        if sock is None:
+            continue
+        if sock.queue.qsize() > SPECTATOR_BACKLOG:
+            behind.add(sid)
+            continue
+        for pkt in frame['bin'] if sid in binary_sids and 'bin' in frame else frame['json']:
+            socketio.server.eio.send_packet(eio_sid, pkt)
+        sent += 1
+        if sent % SPECTATOR_BATCH == 0:
+            socketio.sleep(0)
+    SPECTATOR_FRAMES.inc('sent', amount=sent)
+    if behind:
+        SPECTATOR_FRAMES.inc('skipped', amount=len(behind))
+        with watch_lock:
+            lagging.setdefault(room_code, set()).update(behind)
+
+def flush_spectators():
+    """Capture frames of changed watched rooms and send every frame that is ready"""
+    with watch_lock:
+        changed = list(watch_dirty)
+        watch_dirty.clear()
+    for room_code in changed:
+        # usually runs right away; a busy room's frame goes out next tick
+        room_actors.post(room_code, capture_frame, room_code)
+    
+    with watch_lock:
+        ready = [(room_code, frames.get(room_code)) for room_code in fresh_frames]
+        fresh_frames.clear()
+        retry = [(room_code, frames.get(room_code), sids) for room_code, sids in lagging.items()]
+        lagging.clear()
+    sent = set()
+    for room_code, frame in ready:
+        if frame is not None:
+            fan_out(room_code, frame)
+            sent.add(room_code)
+    for room_code, frame, sids in retry:
+        if frame is not None and room_code not in sent:
+            fan_out(room_code, frame, sids)
+
+def spectator_loop():
+    while True:
+        socketio.sleep(SPECTATOR_INTERVAL)
+        flush_spectators()
+
+def stop_watching(sid):
+    with watch_lock:
+        room_code = spectators.pop(sid, None)
+        if room_code in watchers:
+            watchers[room_code].discard(sid)
+            if not watchers[room_code]:
+                del watchers[room_code]
+    if room_code:
+        socketio.server.leave_room(sid, room_code + '~watch', namespace='/')
+
+# The page and its CSS/JS, read, fingerprinted and compressed once
+page_assets = assets.build()
+if 'socket.io.min.js' not in page_assets:
+    log.warning("static/socket.io.min.js missing, the page loads the Socket.IO client from the CDN",
+                extra={'cdn': assets.SOCKET_IO_CDN})
+
+def serve_asset(name):
+    """A prebuilt asset in the smallest encoding the client takes, or 304"""
+    asset = page_assets.get(name)
+    if asset is None:
+        return jsonify({'error': 'Not found'}), 404
+    matched = next((etag for etag in asset.etags() if etag in request.if_none_match), None)
+    if matched:
+        response = app.response_class(status=304)
+        response.set_etag(matched)
+    else:
+        encoding, body = asset.pick(lambda encoding: encoding in request.accept_encodings)
+        response = app.response_class(body, content_type=asset.content_type)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(asset.etag(encoding))
+    response.headers['Cache-Control'] = asset.cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_CODE)
+    return serve_asset('index.html')
+
+@app.route('/static/<name>')
+def static_asset(name):
+    return serve_asset(name)
+
+@app.after_request
+def allow_cross_shard(response):
+    """Let a page served by one shard query another shard's API"""
+    if request.path.startswith(('/api/join-room/', '/health')):
+        response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+# POST /admin/profile?seconds=N samples this worker for N seconds and
+# writes collapsed stacks to PROFILE_DIR (see profiler.py). Admin routes
+# need the X-Admin-Token header to match ADMIN_TOKEN; unset, they're off.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', tempfile.gettempdir())
+MAX_PROFILE_SECONDS = 300
+
+def profile_tag(frame):
+    """(event, room_code) if frame starts a socket event or a room's mailbox event"""
+    code = frame.f_code
+    if code is flask_socketio.SocketIO._handle_event.__code__:
+        local = frame.f_locals
+        args = local.get('args') or ()
+        data = args[0] if args and isinstance(args[0], dict) else {}
+        room_code = data.get('room_code') or session_rooms.get(local.get('sid'), (None, None))[0]
+        return local.get('message'), room_code
+    if code is Mailboxes._drain.__code__:
+        local = frame.f_locals
+        fn, args = local.get('fn'), local.get('args')
+        if fn == scheduler.run:
+            fn = args[0].fn  # a due timer: name what it runs
+        return getattr(fn, '__name__', None), local.get('key')
+    return None
+
+profiler = SamplingProfiler(tag=profile_tag, mode_of=lambda room_code: getattr(game_rooms.peek(room_code), 'mode', None))
+
+def is_admin():
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Start a sampling profile (POST), or its status / ?download=1 the last one (GET)"""
+    if not is_admin():
+        return jsonify({'error': 'Not found'}), 404
+    
+    if request.method == 'POST':
+        try:
+            seconds = float(request.args.get('seconds', '10'))
+        except ValueError:
+            seconds = math.nan
+        if not (math.isfinite(seconds) and seconds > 0):
+            return jsonify({'error': 'seconds must be a positive number'}), 400
+        seconds = min(seconds, MAX_PROFILE_SECONDS)
+        path = os.path.join(PROFILE_DIR, f"ludo-profile-{sharding.SHARD_ID}-{os.getpid()}-{int(time.time())}.collapsed")
+        if not profiler.start(seconds, path):
+            return jsonify({'error': 'A profile is already running', **profiler.status()}), 409
+        log.warning("profiling started", extra={'seconds': seconds, 'path': path})
+        return jsonify({'started': True, 'seconds': seconds, 'path': path}), 202
+    
+    last = profiler.last
+    if request.args.get('download'):
+        if profiler.running or not last or 'error' in last:
+            return jsonify({'error': 'No finished profile', **profiler.status()}), 404
+        with open(last['path']) as f:
+            return app.response_class(f.read(), mimetype='text/plain')
+    return jsonify(profiler.status())
 
 @app.route('/health')
 def health():
-    """Health check endpoint for monitoring"""
-    return jsonify({'status': 'ok', 'rooms': len(game_rooms)})
+    """Health check endpoint for monitoring; ?cluster=1 adds the other shards"""
+    status = {'status': 'ok', 'rooms': len(game_rooms), 'room_stats': game_rooms.stats,
+              'shard': sharding.SHARD_ID, 'shards': sharding.SHARD_COUNT, 'bots': bot_pool.metrics(),
+              'room_db': dict(room_db.stats, dirty=len(room_db)),
+              'mailboxes': room_actors.metrics()}
+    if request.args.get('cluster'):
+        others = sharding.cluster_health()
+        status['cluster'] = others
+        status['total_rooms'] = status['rooms'] + sum(s.get('rooms', 0) for s in others)
+    return jsonify(status)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Handler latencies, emits, connections, rooms and bot timings for Prometheus"""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/create-room', methods=['POST'])
 def create_room():
     """API endpoint to create a new game room"""
-    data = request.json
+    settings = game_settings(request.get_json(silent=True) or {})
+    if settings is None:
+        return jsonify({'success': False, 'error': 'mode must be computer or multiplayer, num_players 2 or 4'}), 400
     room_code = generate_room_code()
     
-    game_state = create_game_state()
-    game_state['room_code'] = room_code
-    game_state['mode'] = data.get('mode', 'multiplayer')
-    game_state['num_players'] = data.get('num_players', 4)
+    game_state = new_room(room_code)
+    game_state.mode, game_state.num_players = settings
     
     game_rooms[room_code] = game_state
+    start_reaper()
+    room_db.mark(room_code, game_state, event_log.end)
+    start_writer()
     
     return jsonify({
         'success': True,
         'room_code': room_code,
+        'shard_url': sharding.shard_url(),
         'message': f'Room {room_code} created successfully!'
     })
 
@@ -87,17 +635,25 @@ def check_room(room_code):
     """API endpoint to check if a room exists and get its status"""
     room_code = room_code.upper()
     
-    if room_code in game_rooms:
-        game = game_rooms[room_code]
+    if not sharding.is_local(room_code):
+        return jsonify({
+            'success': False,
+            'redirect': True,
+            'room_code': room_code,
+            'shard_url': sharding.owner_url(room_code)
+        })
+    
+    game = find_room(room_code)
+    if game is not None:
         return jsonify({
             'success': True,
             'exists': True,
             'room_code': room_code,
-            'players_connected': game['connected_players'],
-            'max_players': game['num_players'],
-            'game_started': game['game_started'],
-            'available_colors': [c for c in ['red', 'green', 'yellow', 'blue'] 
-                               if c not in game['player_sessions'].values()]
+            'players_connected': game.connected_players,
+            'max_players': game.num_players,
+            'game_started': game.game_started,
+            'shard_url': sharding.shard_url(),
+            'available_colors': game.available_colors()
         })
     else:
         return jsonify({
@@ -107,120 +663,236 @@ def check_room(room_code):
         })
 
 @socketio.on('connect')
-def handle_connect():
-    print(f"✅ Client connected: {request.sid}")
+def handle_connect(auth=None):
+    rooms_log.debug("client connected", extra={'sid': request.sid})
+    CONNECTIONS.inc()
+    if isinstance(auth, dict) and auth.get('wire') == 'bin':
+        binary_sids.add(request.sid)
+        emit('wire_hello', {'wire': 'bin', 'templates': wire.LOG_TEMPLATES, 'colors': engine.COLORS,
+                            'modes': wire.MODES, 'path_start': engine.PATH_START})
     emit('connection_status', {'status': 'connected', 'session_id': request.sid})
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f"❌ Client disconnected: {request.sid}")
-    
-    for room_code, game_state in list(game_rooms.items()):
-        if request.sid in game_state['player_sessions']:
-            game_state['connected_players'] -= 1
-            color = game_state['player_sessions'][request.sid]
-            del game_state['player_sessions'][request.sid]
-            
-            game_state['log'] = f"❌ {color.upper()} player disconnected"
-            emit('update_state', game_state, room=room_code)
+    rooms_log.debug("client disconnected", extra={'sid': request.sid})
+    CONNECTIONS.dec()
+    stop_watching(request.sid)
+    binary_sids.discard(request.sid)
+    
+    room_code, color = session_rooms.pop(request.sid, (None, None))
+    if color:
+        room_actors.post(room_code, player_left, room_code, request.sid, color)
+    elif room_code == f"LOCAL_{request.sid}":
+        # Nobody else can ever reach a local game once its player is gone
+        room_actors.post(room_code, game_rooms.pop, room_code)
+
+def player_left(room_code, sid, color):
+    game_state = game_rooms.peek(room_code)
+    if game_state and game_state.unseat(sid):
+        game_state.log = f"❌ {color.upper()} player disconnected"
+        broadcast_state(room_code)
+
+def release_seat(sid):
+    """Free the seat a session holds in another room before it takes a new one"""
+    room_code, color = session_rooms.pop(sid, (None, None))
+    if color:
+        exit_room(room_code, sid)
+        room_actors.post(room_code, unseat, room_code, sid)
+    elif room_code == f"LOCAL_{sid}":
+        room_actors.post(room_code, game_rooms.pop, room_code)
+
+def unseat(room_code, sid):
+    game_state = game_rooms.peek(room_code)
+    if game_state:
+        game_state.unseat(sid)
 
 @socketio.on('join_room_with_code')
+@HANDLER_SECONDS.time('join_room_with_code')
 def handle_join_room(data):
     """Join a specific game room with a code"""
     room_code = data.get('room_code', '').upper()
     selected_color = data.get('color')
     
-    if room_code not in game_rooms:
+    game_state = find_room(room_code)
+    if game_state is None:
         emit('error', {'message': 'Room not found'})
         return
     
-    game_state = game_rooms[room_code]
+    if selected_color not in engine.COLOR_INDEX:
+        emit('error', {'message': 'Invalid color'})
+        return
     
-    if selected_color in game_state['player_sessions'].values():
+    if not game_state.is_open(selected_color):
         emit('error', {'message': 'Color already taken'})
         return
     
-    join_room(room_code)
-    game_state['player_sessions'][request.sid] = selected_color
-    game_state['connected_players'] += 1
+    stop_watching(request.sid)
+    release_seat(request.sid)
+    room_actors.post(room_code, seat_player, room_code, request.sid, selected_color)
+
+def seat_player(room_code, sid, selected_color):
+    game_state = game_rooms.peek(room_code)
+    if game_state is None:
+        socketio.emit('error', {'message': 'Room not found'}, to=sid)
+        return
+    if not game_state.is_open(selected_color):
+        # someone else took it while this join was queued
+        socketio.emit('error', {'message': 'Color already taken'}, to=sid)
+        return
     
-    print(f"🎮 Player {request.sid} joined room {room_code} as {selected_color}")
+    enter_room(room_code, sid)
+    game_state.seat(sid, selected_color)
+    session_rooms[sid] = (room_code, selected_color)
     
-    game_state['log'] = f"✅ {selected_color.upper()} player joined! ({game_state['connected_players']}/{game_state['num_players']})"
-    emit('room_joined', {'room_code': room_code, 'color': selected_color})
-    emit('update_state', game_state, room=room_code)
+    rooms_log.info("player joined", extra={'room': room_code, 'color': selected_color, 'sid': sid})
+    
+    game_state.log = f"✅ {selected_color.upper()} player joined! ({game_state.connected_players}/{game_state.num_players})"
+    socketio.emit('room_joined', {'room_code': room_code, 'color': selected_color}, to=sid)
+    broadcast_state(room_code)
+    send_snapshot(room_code, sid)
+
+@socketio.on('watch_room')
+def handle_watch_room(data):
+    """Watch a room read-only, without taking a seat"""
+    room_code = (data.get('room_code') or '').upper()
+    if find_room(room_code) is None:
+        emit('error', {'message': 'Room not found'})
+        return
+    stop_watching(request.sid)
+    release_seat(request.sid)
+    room_actors.post(room_code, add_spectator, room_code, request.sid)
+
+def add_spectator(room_code, sid):
+    global spectators_started
+    if game_rooms.peek(room_code) is None:
+        socketio.emit('error', {'message': 'Room not found'}, to=sid)
+        return
+    socketio.server.enter_room(sid, room_code + '~watch', namespace='/')
+    with watch_lock:
+        spectators[sid] = room_code
+        watchers.setdefault(room_code, set()).add(sid)
+        count = len(watchers[room_code])
+        start = not spectators_started
+        spectators_started = True
+    if start:
+        start_task(spectator_loop)
+    
+    rooms_log.info("spectator joined", extra={'room': room_code, 'sid': sid, 'spectators': count})
+    socketio.emit('watching', {'room_code': room_code, 'spectators': count}, to=sid)
+    send_snapshot(room_code, sid)
 
 @socketio.on('start_game')
+@HANDLER_SECONDS.time('start_game')
 def handle_start_game(data):
+    if request.sid in spectators:
+        return
     room_code = data.get('room_code')
-    
-    if room_code and room_code in game_rooms:
-        game_state = game_rooms[room_code]
-        print(f"🎮 Using existing room {room_code}")
-    else:
+    if room_code and not sharding.is_local(room_code):
+        emit('error', {'message': 'Room is on another server', 'room_code': room_code,
+                       'owner_url': sharding.owner_url(room_code)})
+        return
+    settings = game_settings(data)
+    if settings is None or data.get('user_color') not in (None, *engine.COLORS):
+        emit('error', {'message': 'Invalid game settings'})
+        return
+    create = not room_code or find_room(room_code) is None
+    if create:
         room_code = f"LOCAL_{request.sid}"
-        game_state = create_game_state()
+    room_actors.post(room_code, start_game, room_code, request.sid, data, settings, create)
+
+def start_game(room_code, sid, data, settings, create):
+    if not create:
+        game_state = game_rooms.peek(room_code)
+        if game_state is None:
+            return
+        if game_state.game_started and set(game_state.seated_colors()) <= set(game_state.active_colors):
+            # everyone seated is already playing, e.g. rejoining a restored game
+            socketio.emit('room_assigned', {'room_code': room_code}, to=sid)
+            send_snapshot(room_code, sid)
+            return
+    else:
+        game_state = new_room(room_code)
         game_rooms[room_code] = game_state
-        join_room(room_code)
-        print(f"🎮 Created local room {room_code}")
-    
-    game_state['mode'] = data.get('mode', 'multiplayer')
-    game_state['num_players'] = data.get('num_players', 4)
-    game_state['user_color'] = data.get('user_color')
-    game_state['game_started'] = True
-    game_state['room_code'] = room_code
-    
-    if data['num_players'] == 2:
-        if data['mode'] == 'computer':
-            opp = {'red':'yellow', 'yellow':'red', 'green':'blue', 'blue':'green'}
-            game_state['active_colors'] = [data['user_color'], opp[data['user_color']]]
-        else:
-            if room_code.startswith('LOCAL_'):
-                game_state['active_colors'] = ['red', 'yellow']
-            else:
-                game_state['active_colors'] = list(game_state['player_sessions'].values())
+        start_reaper()
+        enter_room(room_code, sid)
+        session_rooms.setdefault(sid, (room_code, None))
+    
+    game_state.mode, game_state.num_players = settings
+    game_state.user_color = data.get('user_color')
+    game_state.difficulty = data.get('difficulty') if data.get('difficulty') in bots.LEVELS else bots.DEFAULT_LEVEL
+    game_state.room_code = room_code
+    
+    if room_code.startswith('LOCAL_') or (game_state.num_players == 2 and game_state.mode == 'computer'):
+        active_colors = engine.seat_colors(game_state.num_players, game_state.mode, game_state.user_color)
     else:
-        if room_code.startswith('LOCAL_'):
-            game_state['active_colors'] = ['red', 'green', 'yellow', 'blue']
-        else:
-            game_state['active_colors'] = list(game_state['player_sessions'].values())
+        active_colors = game_state.seated_colors()
     
-    for color in game_state['active_colors']:
-        game_state['players'][color]['tokens'] = [-1, -1, -1, -1]
+    scheduler.cancel(room_code)
+    bot_pool.cancel(room_code)
+    engine.start(game_state, active_colors)
+    event_log.snapshot(room_code, game_state)
     
-    game_state['turn_order'] = game_state['active_colors'][:]
-    game_state['turn'] = game_state['turn_order'][0]
-    game_state['rolled_value'] = None
-    game_state['can_move'] = False
-    game_state['log'] = f"🎮 {game_state['turn'].upper()}'s TURN - CLICK DICE TO ROLL!"
+    game_log.info("game started", extra={'room': room_code, 'mode': game_state.mode,
+                                         'players': len(active_colors), 'difficulty': game_state.difficulty})
     
-    print(f"✅ Game initialized in room {room_code}")
+    socketio.emit('room_assigned', {'room_code': room_code}, to=sid)
+    broadcast_state(room_code)
+    send_snapshot(room_code, sid)
     
-    emit('room_assigned', {'room_code': room_code})
-    emit('update_state', game_state, room=room_code)
+    if engine.is_bot_turn(game_state):
+        scheduler.call_later(BOT_ROLL_DELAY, bot_turn, room_code, key=room_code)
+
+@socketio.on('request_state')
+def handle_request_state(data):
+    """Resend the full state to a client whose update sequence has a gap"""
+    room_code = data.get('room_code') if data else None
     
-    if game_state['mode'] == 'computer' and game_state['turn'] != game_state['user_color']:
-        socketio.start_background_task(bot_turn, room_code)
+    if room_code in game_rooms and (room_code in rooms() or spectators.get(request.sid) == room_code):
+        room_actors.post(room_code, send_snapshot, room_code, request.sid)
+
+@socketio.on('act')
+def handle_act(data):
+    """Binary clients' actions: bytes (op, token) for the session's room"""
+    if not isinstance(data, (bytes, bytearray)) or len(data) != 2:
+        return
+    room_code = session_rooms.get(request.sid, (None, None))[0] or spectators.get(request.sid)
+    op, token = data
+    if op == wire.ACT_ROLL:
+        handle_roll({'room_code': room_code})
+    elif op == wire.ACT_MOVE and token < 4:
+        handle_move({'room_code': room_code, 'token_index': token})
+    elif op == wire.ACT_RESYNC:
+        handle_request_state({'room_code': room_code})
 
 @socketio.on('roll_dice')
+@HANDLER_SECONDS.time('roll_dice')
 def handle_roll(data=None):
     room_code = data.get('room_code') if data else None
     
     if not room_code or room_code not in game_rooms:
-        print(f"❌ Invalid room: {room_code}")
+        game_log.debug("roll for unknown room", extra={'room': room_code})
+        return
+    if request.sid in spectators:
         return
     
-    game_state = game_rooms[room_code]
+    room_actors.post(room_code, player_roll, room_code, request.sid)
+
+def player_roll(room_code, sid):
+    game_state = game_rooms.peek(room_code)
     
-    if not game_state['game_started'] or game_state['rolled_value'] is not None:
+    if game_state is None or not game_state.game_started or game_state.rolled_value is not None:
+        return
+    
+    # The dice are about to pass on; don't let the same player roll again
+    if scheduler.pending(room_code):
         return
     
     if not room_code.startswith('LOCAL_'):
-        player_color = game_state['player_sessions'].get(request.sid)
-        if player_color and player_color != game_state['turn']:
+        player_color = game_state.color_of(sid)
+        if player_color and player_color != game_state.turn:
             return
     
-    if game_state['mode'] == 'computer' and game_state['turn'] != game_state['user_color']:
+    if engine.is_bot_turn(game_state):
         return
     
     roll_dice(room_code)
@@ -228,640 +900,115 @@ def handle_roll(data=None):
 def roll_dice(room_code):
     game_state = game_rooms[room_code]
     
-    val = random.randint(1, 6)
-    game_state['rolled_value'] = val
-    game_state['log'] = f"🎲 {game_state['turn'].upper()} ROLLED {val}!"
-    
-    tokens = game_state['players'][game_state['turn']]['tokens']
-    has_moves = any((t == -1 and val == 6) or (t >= 0 and t + val <= 57) for t in tokens)
-    
-    if not has_moves:
-        game_state['log'] += " ❌ NO VALID MOVES!"
-        socketio.emit('update_state', game_state, room=room_code)
-        socketio.sleep(2.0)
-        next_turn(room_code)
+    moves = engine.roll_dice(game_state)
+    event_log.roll(room_code, game_state)
+    if not moves:
+        broadcast_state(room_code)
+        scheduler.call_later(NO_MOVES_DELAY, next_turn, room_code, key=room_code)
     else:
-        game_state['can_move'] = True
-        game_state['log'] += " ✅ CLICK A TOKEN TO MOVE!"
-        socketio.emit('update_state', game_state, room=room_code)
+        broadcast_state(room_code)
         
-        if game_state['mode'] == 'computer' and game_state['turn'] != game_state['user_color']:
-            socketio.start_background_task(bot_make_move, room_code)
+        if engine.is_bot_turn(game_state):
+            if bots.LEVELS.get(game_state.difficulty):
+                bot_pool.submit(room_code, game_state)
+            scheduler.call_later(BOT_MOVE_DELAY, bot_make_move, room_code, key=room_code)
 
 @socketio.on('move_token')
+@HANDLER_SECONDS.time('move_token')
 def handle_move(data):
     room_code = data.get('room_code')
+    token_idx = data.get('token_index')
     
-    if not room_code or room_code not in game_rooms:
+    if not room_code or room_code not in game_rooms or request.sid in spectators:
+        return
+    if not isinstance(token_idx, int) or not 0 <= token_idx < 4:
         return
     
-    game_state = game_rooms[room_code]
+    room_actors.post(room_code, player_move, room_code, request.sid, token_idx)
+
+def player_move(room_code, sid, token_idx):
+    game_state = game_rooms.peek(room_code)
     
-    if not game_state['can_move']:
+    if game_state is None or not game_state.can_move:
         return
     
     if not room_code.startswith('LOCAL_'):
-        player_color = game_state['player_sessions'].get(request.sid)
-        if player_color and player_color != game_state['turn']:
+        player_color = game_state.color_of(sid)
+        if player_color and player_color != game_state.turn:
             return
     
-    if game_state['mode'] == 'computer' and game_state['turn'] != game_state['user_color']:
+    if engine.is_bot_turn(game_state):
         return
     
-    move_token(data['token_index'], room_code)
+    move_token(token_idx, room_code)
 
 def move_token(token_idx, room_code):
     game_state = game_rooms[room_code]
-    player = game_state['turn']
-    tokens = game_state['players'][player]['tokens']
-    roll = game_state['rolled_value']
-    captured = False
-    
-    if tokens[token_idx] == -1 and roll != 6:
-        return
-    
-    if tokens[token_idx] >= 0 and tokens[token_idx] + roll > 57:
-        return
-    
-    if tokens[token_idx] == -1 and roll == 6:
-        tokens[token_idx] = 0
-        game_state['log'] = f"🚀 {player.upper()} BROUGHT TOKEN OUT!"
-    elif tokens[token_idx] >= 0:
-        new_pos = tokens[token_idx] + roll
-        tokens[token_idx] = 99 if new_pos == 57 else new_pos
-        game_state['log'] = f"🎯 {player.upper()} MOVED!"
-    
-    if 0 <= tokens[token_idx] <= 51 and tokens[token_idx] not in SAFE_POSITIONS:
-        my_pos = (game_state['players'][player]['path_start'] + tokens[token_idx]) % 52
-        for opp in game_state['active_colors']:
-            if opp == player: continue
-            opp_tokens = game_state['players'][opp]['tokens']
-            for i, pos in enumerate(opp_tokens):
-                if 0 <= pos <= 51:
-                    opp_pos = (game_state['players'][opp]['path_start'] + pos) % 52
-                    if opp_pos == my_pos:
-                        opp_tokens[i] = -1
-                        captured = True
-                        game_state['log'] = f"⚔️ {player.upper()} CAPTURED {opp.upper()}!"
-    
-    if all(t == 99 for t in tokens):
-        game_state['log'] = f"🏆 {player.upper()} WINS! 🎉🎉🎉"
-        game_state['game_started'] = False
-        socketio.emit('update_state', game_state, room=room_code)
-        return
-    
-    socketio.emit('update_state', game_state, room=room_code)
-    
-    game_state['rolled_value'] = None
-    game_state['can_move'] = False
-    
-    if roll == 6 or captured:
-        game_state['log'] = f"🔄 {player.upper()} GETS EXTRA TURN!"
-        socketio.emit('update_state', game_state, room=room_code)
-        socketio.sleep(1.5)
-        if game_state['mode'] == 'computer' and player != game_state['user_color']:
-            socketio.start_background_task(bot_turn, room_code)
+    
+    result = engine.apply(game_state, token_idx)
+    if result is None:
+        return
+    event_log.move(room_code, game_state, token_idx, result)
+    
+    broadcast_state(room_code)
+    if result['won']:
+        return
+    
+    engine.end_move(game_state, result)
+    
+    if result['extra_turn']:
+        broadcast_state(room_code)
+        if engine.is_bot_turn(game_state):
+            scheduler.call_later(EXTRA_TURN_DELAY + BOT_ROLL_DELAY, bot_turn, room_code, key=room_code)
     else:
-        socketio.sleep(1.2)
-        next_turn(room_code)
+        scheduler.call_later(NEXT_TURN_DELAY, next_turn, room_code, key=room_code)
 
 def next_turn(room_code):
+    if room_code not in game_rooms:
+        return
+    
     game_state = game_rooms[room_code]
     
-    idx = game_state['turn_order'].index(game_state['turn'])
-    game_state['turn'] = game_state['turn_order'][(idx + 1) % len(game_state['turn_order'])]
-    game_state['rolled_value'] = None
-    game_state['can_move'] = False
-    game_state['log'] = f"👉 {game_state['turn'].upper()}'s TURN - CLICK DICE TO ROLL!"
+    engine.next_turn(game_state)
+    event_log.pass_turn(room_code, game_state)
     
-    socketio.emit('update_state', game_state, room=room_code)
+    broadcast_state(room_code)
     
-    socketio.sleep(0.8)
-    if game_state['mode'] == 'computer' and game_state['turn'] != game_state['user_color']:
-        socketio.start_background_task(bot_turn, room_code)
+    if engine.is_bot_turn(game_state):
+        scheduler.call_later(BOT_HANDOFF_DELAY + BOT_ROLL_DELAY, bot_turn, room_code, key=room_code)
 
 def bot_turn(room_code):
-    socketio.sleep(2.0)
-    
     if room_code not in game_rooms:
         return
     
     game_state = game_rooms[room_code]
     
-    if (game_state['mode'] != 'computer' or 
-        game_state['turn'] == game_state['user_color'] or 
-        game_state['rolled_value'] is not None):
+    if not engine.is_bot_turn(game_state) or game_state.rolled_value is not None:
         return
     
     roll_dice(room_code)
 
 def bot_make_move(room_code):
-    socketio.sleep(1.8)
-    
     if room_code not in game_rooms:
         return
     
     game_state = game_rooms[room_code]
     
-    if (not game_state['can_move'] or 
-        game_state['mode'] != 'computer' or 
-        game_state['turn'] == game_state['user_color']):
+    if not game_state.can_move or not engine.is_bot_turn(game_state):
         return
     
-    tokens = game_state['players'][game_state['turn']]['tokens']
-    roll = game_state['rolled_value']
-    
-    movable = [i for i, t in enumerate(tokens) 
-               if (t == -1 and roll == 6) or (t >= 0 and t + roll <= 57)]
-    
-    if movable:
-        home_tokens = [i for i in movable if tokens[i] == -1]
-        if home_tokens and roll == 6:
-            chosen = random.choice(home_tokens)
-        else:
-            chosen = max(movable, key=lambda i: tokens[i] if tokens[i] >= 0 else -100)
-        
+    chosen = bot_pool.result(room_code, game_state)
+    if chosen is PENDING:
+        scheduler.call_later(BOT_POLL_INTERVAL, bot_make_move, room_code, key=room_code)
+        return
+    if chosen is None:
+        chosen = engine.heuristic_move(game_state)
+    if chosen is not None:
         move_token(chosen, room_code)
 
-HTML_CODE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🎲 Ludo Pro - Production Ready!</title>
-    <script src="https://cdn.socket.io/4.5.4/socket.io.min.js"></script>
-    <style>
-        * {margin:0;padding:0;box-sizing:border-box;}
-        :root {--red:#ff4d4d;--green:#2ecc71;--yellow:#f1c40f;--blue:#3498db;--dark:#2c3e50;}
-        body {font-family:'Segoe UI',Tahoma,Geneva,Verdana,sans-serif;background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);display:flex;flex-direction:column;align-items:center;padding:20px;color:white;margin:0;min-height:100vh;justify-content:center;}
-        
-        #main-menu, #color-select, #player-select, #room-menu {text-align:center;display:block;}
-        #main-menu h1 {font-size:56px;margin-bottom:40px;text-shadow:3px 3px 6px rgba(0,0,0,0.3);animation:glow 2s ease-in-out infinite alternate;}
-        @keyframes glow {from {text-shadow:0 0 20px #fff,0 0 30px #fff,0 0 40px #f39c12;} to {text-shadow:0 0 10px #fff,0 0 20px #f39c12;}}
-        .big-btn {background:linear-gradient(135deg,#f39c12,#e67e22);color:white;font-size:32px;font-weight:bold;padding:25px 50px;margin:20px;border:none;border-radius:15px;cursor:pointer;box-shadow:0 10px 20px rgba(0,0,0,0.3);transition:all 0.3s;text-transform:uppercase;letter-spacing:2px;}
-        .big-btn:hover {transform:translateY(-5px) scale(1.05);box-shadow:0 15px 30px rgba(0,0,0,0.4);}
-        
-        .room-code-display {background:rgba(255,255,255,0.2);padding:20px 40px;border-radius:15px;margin:20px auto;font-size:48px;font-weight:900;letter-spacing:8px;box-shadow:0 8px 16px rgba(0,0,0,0.3);border:3px solid rgba(255,255,255,0.4);}
-        
-        .input-field {font-size:32px;padding:20px;border-radius:10px;border:3px solid rgba(255,255,255,0.3);background:rgba(255,255,255,0.9);color:#2c3e50;font-weight:bold;letter-spacing:4px;text-align:center;text-transform:uppercase;margin:20px;}
-        .input-field:focus {outline:none;border-color:#f39c12;box-shadow:0 0 20px rgba(243,156,18,0.5);}
-        
-        .color-option {display:inline-block;width:120px;height:120px;margin:25px;border-radius:50%;cursor:pointer;border:8px solid rgba(255,255,255,0.3);position:relative;transition:all 0.3s;box-shadow:0 8px 16px rgba(0,0,0,0.2);}
-        .color-option:hover {transform:scale(1.1);border-color:rgba(255,215,0,0.6);box-shadow:0 12px 24px rgba(0,0,0,0.3);}
-        .color-option.selected {border-color:gold;transform:scale(1.15);box-shadow:0 0 30px rgba(255,215,0,0.6);}
-        .color-option.disabled {opacity:0.3;cursor:not-allowed;filter:grayscale(100%);}
-        .color-option::after {content:'✓';position:absolute;inset:0;color:white;font-size:70px;display:flex;align-items:center;justify-content:center;opacity:0;font-weight:bold;text-shadow:2px 2px 4px rgba(0,0,0,0.5);}
-        .color-option.selected::after {opacity:1;}
-        
-        .player-option {background:linear-gradient(135deg,#3498db,#2980b9);color:white;font-size:28px;font-weight:bold;padding:35px 70px;margin:25px;border-radius:15px;cursor:pointer;display:inline-block;box-shadow:0 8px 16px rgba(0,0,0,0.3);transition:all 0.3s;text-transform:uppercase;}
-        .player-option:hover {transform:translateY(-5px) scale(1.05);box-shadow:0 12px 24px rgba(0,0,0,0.4);}
-        
-        .player-bar {display:flex;justify-content:space-between;width:700px;margin:12px 0;}
-        .status-box {display:flex;align-items:center;background:white;padding:15px 25px;border-radius:15px;gap:15px;cursor:pointer;border:5px solid transparent;transition:all 0.3s;color:var(--dark);box-shadow:0 4px 8px rgba(0,0,0,0.2);font-weight:bold;min-width:160px;justify-content:center;}
-        .status-box:hover {transform:translateY(-2px) scale(1.02);box-shadow:0 6px 12px rgba(0,0,0,0.3);}
-        .status-box.active {border:5px solid #f1c40f;transform:translateY(-3px) scale(1.05);box-shadow:0 0 30px rgba(241,196,15,0.8);background:#fffef5;}
-        .status-box.bot {opacity:0.8;}
-        
-        .color-indicator {width:28px;height:28px;border-radius:50%;border:3px solid #555;box-shadow:0 2px 4px rgba(0,0,0,0.2);}
-        
-        .dice-slot {width:70px;height:70px;background:linear-gradient(145deg,#ffffff,#f0f0f0);border-radius:15px;display:flex;align-items:center;justify-content:center;font-size:32px;font-weight:900;border:4px solid #ddd;box-shadow:0 4px 8px rgba(0,0,0,0.2);transition:all 0.2s;cursor:pointer;user-select:none;}
-        .dice-slot:hover {transform:scale(1.1);box-shadow:0 6px 12px rgba(0,0,0,0.3);}
-        .status-box.active .dice-slot {animation:shakeDice 0.8s infinite;background:linear-gradient(145deg,#fff9cc,#ffe066);border:4px solid #f39c12;box-shadow:0 0 30px rgba(243,156,18,0.8);font-size:24px;cursor:pointer !important;}
-        @keyframes shakeDice {0%, 100% {transform:rotate(0deg) scale(1);} 25% {transform:rotate(-5deg) scale(1.05);} 75% {transform:rotate(5deg) scale(1.05);}}
-        
-        .board {display:grid;grid-template-columns:repeat(15,46px);grid-template-rows:repeat(15,46px);gap:2px;background:#95a5a6;border:15px solid var(--dark);border-radius:12px;box-shadow:0 20px 40px rgba(0,0,0,0.5);}
-        .cell {background:#ecf0f1;position:relative;display:flex;align-items:center;justify-content:center;transition:background 0.2s;}
-        .cell.safe-zone::after {content:"★";color:#f39c12;font-size:28px;position:absolute;text-shadow:1px 1px 2px rgba(0,0,0,0.2);}
-        
-        #cell-8-2,#cell-8-3,#cell-8-4,#cell-8-5,#cell-8-6 {background:#ffcccb;}
-        #cell-2-8,#cell-3-8,#cell-4-8,#cell-5-8,#cell-6-8 {background:#d5f5e3;}
-        #cell-8-14,#cell-8-13,#cell-8-12,#cell-8-11,#cell-8-10 {background:#fcf3cf;}
-        #cell-14-8,#cell-13-8,#cell-12-8,#cell-11-8,#cell-10-8 {background:#d6eaf8;}
-        
-        .yard {grid-row:span 6;grid-column:span 6;display:flex;align-items:center;justify-content:center;transition:opacity 0.3s;}
-        .yard.red {background:linear-gradient(135deg,#ff6b6b,#ee5a6f);}
-        .yard.green {background:linear-gradient(135deg,#2ecc71,#27ae60);}
-        .yard.blue {background:linear-gradient(135deg,#3498db,#2980b9);}
-        .yard.yellow {background:linear-gradient(135deg,#f1c40f,#f39c12);}
-        .yard.inactive {opacity:0.3;filter:grayscale(80%);}
-        .yard-inner {background:rgba(255,255,255,0.95);width:78%;height:78%;border-radius:12px;display:grid;grid-template-columns:1fr 1fr;gap:12px;padding:18px;box-shadow:inset 0 2px 8px rgba(0,0,0,0.1);}
-        
-        .home-center {grid-column:7/span 3;grid-row:7/span 3;background:conic-gradient(var(--green)0deg 90deg,var(--yellow)90deg 180deg,var(--blue)180deg 270deg,var(--red)270deg 360deg);border-radius:50%;box-shadow:inset 0 0 20px rgba(0,0,0,0.3);}
-        
-        .token {width:36px;height:36px;border-radius:50% 50% 50% 0;transform:rotate(-45deg);border:3px solid white;box-shadow:0 3px 6px rgba(0,0,0,0.3);z-index:10;cursor:pointer;transition:all 0.2s;}
-        .token.red {background:linear-gradient(135deg,#ff4d4d,#c0392b);}
-        .token.green {background:linear-gradient(135deg,#2ecc71,#27ae60);}
-        .token.yellow {background:linear-gradient(135deg,#f1c40f,#f39c12);}
-        .token.blue {background:linear-gradient(135deg,#3498db,#2980b9);}
-        .token:hover {transform:rotate(-45deg) scale(1.1);}
-        .movable {animation:bounce 0.7s infinite alternate;border-color:gold;border-width:4px;box-shadow:0 0 20px rgba(255,215,0,0.9),0 3px 6px rgba(0,0,0,0.3);}
-        @keyframes bounce {from {transform:rotate(-45deg) scale(1);} to {transform:rotate(-45deg) scale(1.25);}}
-        
-        #status-log {background:linear-gradient(135deg,#1abc9c,#16a085);padding:20px 50px;border-radius:40px;margin:18px 0;font-weight:900;font-size:22px;text-align:center;box-shadow:0 8px 16px rgba(0,0,0,0.3);min-width:650px;text-transform:uppercase;letter-spacing:2px;animation:fadeIn 0.5s;}
-        @keyframes fadeIn {from {opacity:0;transform:translateY(-10px);} to {opacity:1;transform:translateY(0);}}
-        
-        #game-container {display:none;}
-        #color-select, #player-select, #room-menu {display:none;}
-        h2 {font-size:42px;margin:30px 0;text-shadow:2px 2px 4px rgba(0,0,0,0.3);}
-        
-        .copy-btn {background:linear-gradient(135deg,#3498db,#2980b9);color:white;font-size:18px;padding:12px 30px;border:none;border-radius:10px;cursor:pointer;margin-top:15px;font-weight:bold;box-shadow:0 4px 8px rgba(0,0,0,0.2);transition:all 0.3s;}
-        .copy-btn:hover {transform:translateY(-2px);box-shadow:0 6px 12px rgba(0,0,0,0.3);}
-        
-        /* Connection status indicator */
-        .connection-status {
-            position: fixed;
-            top: 10px;
-            right: 10px;
-            background: rgba(0,0,0,0.7);
-            color: white;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 14px;
-            z-index: 1000;
-        }
-        .connection-status.connected {
-            background: rgba(46, 204, 113, 0.8);
-        }
-        .connection-status.disconnected {
-            background: rgba(231, 76, 60, 0.8);
-        }
-    </style>
-</head>
-<body>
-    <div class="connection-status" id="connStatus">Connecting...</div>
-
-    <div id="main-menu">
-        <h1>🎲 LUDO PRO 🎲</h1>
-        <button class="big-btn" onclick="startComputer()">🤖 VS COMPUTER</button><br>
-        <button class="big-btn" onclick="startMultiplayer()">👥 LOCAL MULTIPLAYER</button><br>
-        <button class="big-btn" onclick="showOnlineMenu()">🌐 ONLINE MULTIPLAYER</button>
-    </div>
-    
-    <div id="room-menu">
-        <h2>🌐 ONLINE MULTIPLAYER</h2>
-        <button class="big-btn" onclick="createOnlineRoom()">➕ CREATE ROOM</button><br>
-        <h2 style="margin-top:40px;">OR JOIN EXISTING ROOM</h2>
-        <input type="text" class="input-field" id="join-code-input" placeholder="ENTER CODE" maxlength="6"><br>
-        <button class="big-btn" onclick="joinOnlineRoom()">🚪 JOIN ROOM</button><br>
-        <button class="big-btn" style="background:linear-gradient(135deg,#95a5a6,#7f8c8d);margin-top:20px;" onclick="backToMenu()">← BACK</button>
-    </div>
-    
-    <div id="color-select">
-        <h2>🎨 SELECT YOUR COLOR</h2>
-        <div id="room-code-container" style="display:none;">
-            <p style="font-size:24px;margin:20px;">Share this code with friends:</p>
-            <div class="room-code-display" id="room-code-display"></div>
-            <button class="copy-btn" onclick="copyRoomCode()">📋 COPY CODE</button>
-        </div>
-        <div style="margin:60px;">
-            <div class="color-option" style="background:var(--red);" data-color="red"></div>
-            <div class="color-option" style="background:var(--green);" data-color="green"></div><br>
-            <div class="color-option" style="background:var(--blue);" data-color="blue"></div>
-            <div class="color-option" style="background:var(--yellow);" data-color="yellow"></div>
-        </div>
-    </div>
-    
-    <div id="player-select">
-        <h2>👥 SELECT NUMBER OF PLAYERS</h2>
-        <div class="player-option" onclick="confirmGame(2)">2 PLAYERS</div><br>
-        <div class="player-option" onclick="confirmGame(4)">4 PLAYERS</div>
-    </div>
-    
-    <div id="game-container">
-        <div id="status-log">🎮 READY TO PLAY!</div>
-        <div class="player-bar">
-            <div id="box-red" class="status-box">
-                <div class="color-indicator" style="background:var(--red);"></div>
-                <div class="dice-slot" id="dice-red">-</div>
-            </div>
-            <div id="box-green" class="status-box">
-                <div class="dice-slot" id="dice-green">-</div>
-                <div class="color-indicator" style="background:var(--green);"></div>
-            </div>
-        </div>
-        <div class="board" id="board">
-            <div class="yard red" style="grid-area:1/1/7/7;"><div class="yard-inner" id="yard-red"></div></div>
-            <div class="yard green" style="grid-area:1/10/7/16;"><div class="yard-inner" id="yard-green"></div></div>
-            <div class="yard blue" style="grid-area:10/1/16/7;"><div class="yard-inner" id="yard-blue"></div></div>
-            <div class="yard yellow" style="grid-area:10/10/16/16;"><div class="yard-inner" id="yard-yellow"></div></div>
-            <div class="home-center"></div>
-        </div>
-        <div class="player-bar" style="margin-top:15px;">
-            <div id="box-blue" class="status-box">
-                <div class="color-indicator" style="background:var(--blue);"></div>
-                <div class="dice-slot" id="dice-blue">-</div>
-            </div>
-            <div id="box-yellow" class="status-box">
-                <div class="dice-slot" id="dice-yellow">-</div>
-                <div class="color-indicator" style="background:var(--yellow);"></div>
-            </div>
-        </div>
-    </div>
-    
-    <script>
-        const socket = io({
-            transports: ['websocket', 'polling'],
-            upgrade: true,
-            rememberUpgrade: true,
-            timeout: 10000,
-            reconnection: true,
-            reconnectionDelay: 1000,
-            reconnectionAttempts: 5
-        });
-        
-        let gameMode = null;
-        let selectedColor = null;
-        let currentRoomCode = null;
-        let isOnlineMode = false;
-        
-        const connStatus = document.getElementById('connStatus');
-        
-        socket.on('connect', () => {
-            console.log('✅ Connected to server');
-            connStatus.textContent = '✅ Connected';
-            connStatus.className = 'connection-status connected';
-        });
-        
-        socket.on('disconnect', () => {
-            console.log('❌ Disconnected from server');
-            connStatus.textContent = '❌ Disconnected';
-            connStatus.className = 'connection-status disconnected';
-        });
-        
-        socket.on('connect_error', (error) => {
-            console.error('Connection error:', error);
-            connStatus.textContent = '⚠️ Connection Error';
-            connStatus.className = 'connection-status disconnected';
-        });
-        
-        socket.on('error', (data) => {
-            alert(data.message);
-        });
-        
-        socket.on('room_joined', (data) => {
-            console.log('✅ Joined room:', data);
-            currentRoomCode = data.room_code;
-        });
-        
-        socket.on('room_assigned', (data) => {
-            console.log('📍 Room assigned:', data.room_code);
-            currentRoomCode = data.room_code;
-        });
-        
-        const pathCoords = [[7,2],[7,3],[7,4],[7,5],[7,6],[6,7],[5,7],[4,7],[3,7],[2,7],[1,7],[1,8],[1,9],[2,9],[3,9],[4,9],[5,9],[6,9],[7,10],[7,11],[7,12],[7,13],[7,14],[7,15],[8,15],[9,15],[9,14],[9,13],[9,12],[9,11],[9,10],[10,9],[11,9],[12,9],[13,9],[14,9],[15,9],[15,8],[15,7],[14,7],[13,7],[12,7],[11,7],[10,7],[9,6],[9,5],[9,4],[9,3],[9,2],[9,1],[8,1],[7,1]];
-        const homePaths = {
-            red:[[8,2],[8,3],[8,4],[8,5],[8,6],[8,7]],
-            green:[[2,8],[3,8],[4,8],[5,8],[6,8],[7,8]],
-            yellow:[[8,14],[8,13],[8,12],[8,11],[8,10],[8,9]],
-            blue:[[14,8],[13,8],[12,8],[11,8],[10,8],[9,8]]
-        };
-        const safeCoords = ["7-2","2-7","6-9","9-14","14-9","9-2","7-14","2-9"];
-        
-        // Initialize board
-        for(let r=1;r<=15;r++) {
-            for(let c=1;c<=15;c++) {
-                if(!((r<=6&&c<=6)||(r<=6&&c>=10)||(r>=10&&c<=6)||(r>=10&&c>=10)||(r>=7&&r<=9&&c>=7&&c<=9))) {
-                    let cell=document.createElement('div');
-                    cell.className='cell';
-                    cell.id=`cell-${r}-${c}`;
-                    if(safeCoords.includes(`${r}-${c}`)) cell.classList.add('safe-zone');
-                    cell.style.gridRow=r;
-                    cell.style.gridColumn=c;
-                    document.getElementById('board').appendChild(cell);
-                }
-            }
-        }
-        
-        function backToMenu() {
-            document.getElementById('room-menu').style.display='none';
-            document.getElementById('main-menu').style.display='block';
-        }
-        
-        function showOnlineMenu() {
-            document.getElementById('main-menu').style.display='none';
-            document.getElementById('room-menu').style.display='block';
-            isOnlineMode = true;
-        }
-        
-        async function createOnlineRoom() {
-            const response = await fetch('/api/create-room', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({mode: 'multiplayer', num_players: 4})
-            });
-            
-            const data = await response.json();
-            if(data.success) {
-                currentRoomCode = data.room_code;
-                gameMode = 'multiplayer';
-                
-                document.getElementById('room-menu').style.display='none';
-                document.getElementById('color-select').style.display='block';
-                document.getElementById('room-code-container').style.display='block';
-                document.getElementById('room-code-display').innerText = data.room_code;
-                
-                console.log('✅ Room created:', data.room_code);
-            }
-        }
-        
-        async function joinOnlineRoom() {
-            const code = document.getElementById('join-code-input').value.toUpperCase().trim();
-            if(!code) {
-                alert('Please enter a room code!');
-                return;
-            }
-            
-            const response = await fetch(`/api/join-room/${code}`);
-            const data = await response.json();
-            
-            if(data.success && data.exists) {
-                currentRoomCode = code;
-                gameMode = 'multiplayer';
-                
-                document.getElementById('room-menu').style.display='none';
-                document.getElementById('color-select').style.display='block';
-                
-                document.querySelectorAll('.color-option').forEach(option => {
-                    const color = option.getAttribute('data-color');
-                    if(!data.available_colors.includes(color)) {
-                        option.classList.add('disabled');
-                        option.style.pointerEvents = 'none';
-                    }
-                });
-                
-                console.log('✅ Joining room:', code);
-            } else {
-                alert('Room not found! Please check the code.');
-            }
-        }
-        
-        function copyRoomCode() {
-            const code = document.getElementById('room-code-display').innerText;
-            navigator.clipboard.writeText(code);
-            alert('Room code copied: ' + code);
-        }
-        
-        document.querySelectorAll('.color-option').forEach(option => {
-            option.addEventListener('click', function() {
-                if(this.classList.contains('disabled')) return;
-                
-                document.querySelectorAll('.color-option').forEach(el => el.classList.remove('selected'));
-                this.classList.add('selected');
-                selectedColor = this.getAttribute('data-color');
-                console.log('🎨 Selected color:', selectedColor);
-                
-                setTimeout(() => {
-                    if(isOnlineMode && currentRoomCode) {
-                        socket.emit('join_room_with_code', {
-                            room_code: currentRoomCode,
-                            color: selectedColor
-                        });
-                        
-                        document.getElementById('color-select').style.display='none';
-                        document.getElementById('game-container').style.display='block';
-                        
-                        socket.emit('start_game', {
-                            mode: 'multiplayer',
-                            num_players: 4,
-                            room_code: currentRoomCode
-                        });
-                    } else {
-                        document.getElementById('color-select').style.display='none';
-                        document.getElementById('player-select').style.display='block';
-                    }
-                }, 500);
-            });
-        });
-        
-        function startComputer() {
-            console.log('🤖 Starting VS COMPUTER mode');
-            gameMode = 'computer';
-            isOnlineMode = false;
-            document.getElementById('main-menu').style.display='none';
-            document.getElementById('color-select').style.display='block';
-        }
-        
-        function startMultiplayer() {
-            console.log('👥 Starting LOCAL MULTIPLAYER mode');
-            gameMode = 'multiplayer';
-            isOnlineMode = false;
-            document.getElementById('main-menu').style.display='none';
-            document.getElementById('player-select').style.display='block';
-        }
-        
-        function confirmGame(players) {
-            console.log('✅ Starting game:', {mode: gameMode, players, color: selectedColor, room: currentRoomCode});
-            document.getElementById('player-select').style.display='none';
-            document.getElementById('game-container').style.display='block';
-            
-            socket.emit('start_game', {
-                mode: gameMode,
-                num_players: players,
-                user_color: gameMode === 'computer' ? selectedColor : null,
-                room_code: currentRoomCode
-            });
-        }
-        
-        document.querySelectorAll('.status-box').forEach(box => {
-            box.addEventListener('click', function() {
-                console.log('🎲 DICE BOX CLICKED! Room:', currentRoomCode);
-                socket.emit('roll_dice', {room_code: currentRoomCode});
-            });
-        });
-        
-        document.querySelectorAll('.dice-slot').forEach(dice => {
-            dice.addEventListener('click', function(e) {
-                e.stopPropagation();
-                console.log('🎲 DICE SLOT CLICKED! Room:', currentRoomCode);
-                socket.emit('roll_dice', {room_code: currentRoomCode});
-            });
-        });
-        
-        socket.on('update_state', (state) => {
-            console.log('📊 STATE UPDATE:', state.log);
-            
-            document.getElementById('status-log').innerText = state.log;
-            
-            ['red','green','yellow','blue'].forEach(color => {
-                const yard = document.querySelector(`.yard.${color}`);
-                const box = document.getElementById(`box-${color}`);
-                const dice = document.getElementById(`dice-${color}`);
-                
-                yard.classList.toggle('inactive', !state.active_colors.includes(color));
-                box.classList.remove('active','bot');
-                dice.innerText = '-';
-                
-                if(state.turn === color && state.active_colors.includes(color)) {
-                    box.classList.add('active');
-                    if(state.rolled_value !== null) {
-                        dice.innerText = state.rolled_value;
-                    } else {
-                        dice.innerText = (gameMode === 'computer' && color !== state.user_color) ? '🤖' : '🎲';
-                    }
-                    if(gameMode === 'computer' && color !== state.user_color) {
-                        box.classList.add('bot');
-                    }
-                }
-            });
-            
-            document.querySelectorAll('.token').forEach(e => e.remove());
-            
-            ['red','green','yellow','blue'].forEach(color => {
-                if(!state.active_colors.includes(color)) return;
-                
-                state.players[color].tokens.forEach((pos, idx) => {
-                    if(pos === 99) return;
-                    
-                    let token = document.createElement('div');
-                    token.className = `token ${color}`;
-                    
-                    if(state.turn === color && state.can_move && 
-                       (gameMode === 'multiplayer' || color === state.user_color || !isOnlineMode)) {
-                        const roll = state.rolled_value;
-                        if((pos === -1 && roll === 6) || (pos >= 0 && pos + roll <= 57)) {
-                            token.classList.add('movable');
-                            token.onclick = () => {
-                                console.log(`🎯 Token ${idx} clicked. Room: ${currentRoomCode}`);
-                                socket.emit('move_token', {
-                                    token_index: idx,
-                                    room_code: currentRoomCode
-                                });
-                            };
-                        }
-                    }
-                    
-                    if(pos === -1) {
-                        document.getElementById(`yard-${color}`).appendChild(token);
-                    } else if(pos >= 52) {
-                        let step = pos - 52;
-                        let coords = homePaths[color][step];
-                        if(coords) {
-                            const cell = document.getElementById(`cell-${coords[0]}-${coords[1]}`);
-                            if(cell) cell.appendChild(token);
-                        }
-                    } else {
-                        let actualIdx = (state.players[color].path_start + pos) % 52;
-                        let coords = pathCoords[actualIdx];
-                        if(coords) {
-                            const cell = document.getElementById(`cell-${coords[0]}-${coords[1]}`);
-                            if(cell) cell.appendChild(token);
-                        }
-                    }
-                });
-            });
-        });
-    </script>
-</body>
-</html>
-"""
-
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # exit cleanly so atexit handlers run
     port = int(os.getenv('PORT', 5000))
-    print(f"🚀 LUDO SERVER - PRODUCTION MODE")
-    print("=" * 60)
-    print(f"🌐 Server: http://0.0.0.0:{port}")
-    print("✅ All Modes Working")
-    print("=" * 60)
-    # Use eventlet for production
-    socketio.run(app, host='0.0.0.0', port=port, debug=False)
+    log.info("server starting", extra={'url': f"http://0.0.0.0:{port}", 'async_mode': ASYNC_MODE})
+    socketio.run(app, host='0.0.0.0', port=port, debug=False,
+                 allow_unsafe_werkzeug=ASYNC_MODE == 'threading')
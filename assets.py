@@ -0,0 +1,85 @@
+"""The browser page, built once at startup.
+
+The page is plain files in static/: index.html, ludo.css, ludo.js and the
+vendored Socket.IO client, socket.io.min.js (4.6.1). build() reads each one, fingerprints it
+and compresses it once: gzip always, brotli too if the optional `brotli`
+package is installed. index.html links the CSS and JS by fingerprinted URL
+(?v=<hash>), so those are cached for a year and never revalidated, while
+the page itself is revalidated with its ETag and usually costs a 304.
+
+If static/socket.io.min.js is removed the page falls back to the public
+CDN; to put it back or upgrade it:
+
+    curl -o static/socket.io.min.js https://cdn.socket.io/4.6.1/socket.io.min.js
+"""
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+SOCKET_IO_CDN = 'https://cdn.socket.io/4.6.1/socket.io.min.js'
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class Asset:
+    """One file's bodies (identity, gzip, brotli) with a strong ETag each"""
+    __slots__ = ('name', 'content_type', 'cache_control', 'digest', 'bodies')
+
+    def __init__(self, name, body, cache_control):
+        self.name = name
+        self.content_type = CONTENT_TYPES[os.path.splitext(name)[1]]
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:20]
+        self.bodies = {None: body, 'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding=None):
+        """Unquoted strong ETag of one encoding"""
+        return f'{self.digest}-{encoding}' if encoding else self.digest
+
+    def etags(self):
+        return [self.etag(encoding) for encoding in self.bodies]
+
+    def pick(self, accepts):
+        """Smallest body the client accepts, as (encoding, body)"""
+        options = [(len(body), encoding) for encoding, body in self.bodies.items()
+                   if encoding is None or accepts(encoding)]
+        encoding = min(options, key=lambda option: option[0])[1]
+        return encoding, self.bodies[encoding]
+
+
+def _read(static_dir, name):
+    path = os.path.join(static_dir, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def build(static_dir=STATIC_DIR):
+    """name -> Asset for everything the page loads, index.html included"""
+    assets = {}
+    for name in ('ludo.css', 'ludo.js', 'socket.io.min.js'):
+        body = _read(static_dir, name)
+        if body is not None:
+            assets[name] = Asset(name, body, IMMUTABLE)
+
+    page = _read(static_dir, 'index.html').decode()
+    for name, asset in assets.items():
+        page = page.replace(f'"/static/{name}"', f'"/static/{name}?v={asset.digest}"')
+    page = page.replace('"/static/socket.io.min.js"', f'"{SOCKET_IO_CDN}"')
+    assets['index.html'] = Asset('index.html', page.encode(), REVALIDATE)
+    return assets
@@ -0,0 +1,160 @@
+"""NumPy batch simulator: step thousands of Ludo games at once.
+
+Token positions for N games live in one (N, 4 colors, 4 tokens) int8 array
+and every rule from engine.py (entering on a six, the 57-step finish, safe
+squares, captures through the path_start offsets, extra turns) is applied
+as array operations over all live games per step. Inside the array a
+finished token is stored as FINISH (57) rather than FINISHED (99) so the
+"pos + roll <= 57" check needs no special case; export() converts back.
+
+    python batch_sim.py --games 1000000 --players 4
+
+NumPy is only needed for this tool, not for the web server.
+"""
+import argparse
+import time
+from array import array
+
+import numpy as np
+
+from engine import COLORS, PATH_START, SAFE_POSITIONS, HOME, FINISH, FINISHED, TRACK_LEN, seat_colors, create_game_state
+
+POLICIES = ('heuristic', 'random')
+
+_STARTS = np.array([PATH_START[c] for c in COLORS], dtype=np.int16)
+_SAFE = np.zeros(FINISH + 7, dtype=bool)
+_SAFE[SAFE_POSITIONS] = True
+
+
+class BatchGame:
+    """N independent games between the same active colors"""
+
+    def __init__(self, n, active_colors=COLORS, policies=None, seed=None):
+        policies = policies or {}
+        self.rng = np.random.default_rng(seed)
+        self.order = np.array([COLORS.index(c) for c in active_colors], dtype=np.int8)
+        self.active = np.isin(np.arange(4), self.order)
+        self.random_policy = np.array([policies.get(c, 'heuristic') == 'random' for c in COLORS])
+        self.pos = np.full((n, 4, 4), HOME, dtype=np.int8)
+        self.seat = np.zeros(n, dtype=np.int8)      # index into self.order
+        self.winner = np.full(n, -1, dtype=np.int8)  # color index, -1 while playing
+        self.turns = np.zeros(n, dtype=np.int32)
+
+    def _choose(self, tok, roll, legal, color):
+        """Vectorized bot_make_move heuristic, or a random legal token"""
+        noise = self.rng.random(tok.shape)
+        home_legal = legal & (tok == HOME)
+        use_home = (roll == 6) & home_legal.any(1)
+        home_pick = np.where(home_legal, noise, -1.0).argmax(1)
+        score = np.where(legal, np.where(tok >= 0, tok, -100), -1000)
+        heuristic = np.where(use_home, home_pick, score.argmax(1))
+        random_pick = np.where(legal, noise, -1.0).argmax(1)
+        return np.where(self.random_policy[color], random_pick, heuristic)
+
+    def step(self, rolls=None):
+        """Play one roll in every unfinished game; returns how many were live"""
+        live = np.flatnonzero(self.winner < 0)
+        if not live.size:
+            return 0
+        self.turns[live] += 1
+
+        color = self.order[self.seat[live]].astype(np.intp)
+        roll = self.rng.integers(1, 7, live.size) if rolls is None else np.asarray(rolls)[live]
+        tok = self.pos[live, color].astype(np.int16)
+        legal = ((tok == HOME) & (roll[:, None] == 6)) | ((tok >= 0) & (tok + roll[:, None] <= FINISH))
+        has_moves = legal.any(1)
+        advance = ~has_moves
+
+        moving = np.flatnonzero(has_moves)
+        if moving.size:
+            g, c, r = live[moving], color[moving], roll[moving]
+            t = self._choose(tok[moving], r, legal[moving], c)
+            old = tok[moving, t]
+            new = np.where(old == HOME, 0, old + r)
+            self.pos[g, c, t] = new
+
+            # Captures: opponents on the same absolute outer-track square
+            captured = np.zeros(moving.size, dtype=bool)
+            exposed = np.flatnonzero((new < TRACK_LEN) & ~_SAFE[new])
+            if exposed.size:
+                ge, ce = g[exposed], c[exposed]
+                board = self.pos[ge].astype(np.int16)
+                square = (_STARTS[None, :, None] + board) % TRACK_LEN
+                my_square = (_STARTS[ce] + new[exposed]) % TRACK_LEN
+                opponent = self.active[None, :, None] & (np.arange(4)[None, :, None] != ce[:, None, None])
+                hit = opponent & (board >= 0) & (board < TRACK_LEN) & (square == my_square[:, None, None])
+                captured[exposed] = hit.any((1, 2))
+                if captured.any():
+                    board[hit] = HOME
+                    self.pos[ge] = board
+
+            won = (self.pos[g, c] == FINISH).all(1)
+            self.winner[g[won]] = c[won]
+            advance[moving] = ~won & ~((r == 6) | captured)
+
+        passing = live[advance]
+        self.seat[passing] = (self.seat[passing] + 1) % len(self.order)
+        return live.size
+
+    def run(self, max_turns=10000):
+        """Step until every game has a winner or max_turns is reached"""
+        for _ in range(max_turns):
+            if not self.step():
+                break
+        return self
+
+    def export(self, i):
+        """Game i as an engine.GameState"""
+        state = create_game_state()
+        state.active_colors = tuple(COLORS[c] for c in self.order)
+        state.turn = COLORS[self.order[self.seat[i]]]
+        state.game_started = bool(self.winner[i] < 0)
+        state.tokens = array('b', [FINISHED if p == FINISH else int(p) for p in self.pos[i].ravel()])
+        state.board.rebuild(state)
+        return state
+
+
+def simulate(games, active_colors, policies=None, seed=None, batch=100000, max_turns=10000):
+    """Play games in chunks of batch; returns (wins per color, mean turns, unfinished)"""
+    rng = np.random.default_rng(seed)
+    wins = np.zeros(4, dtype=np.int64)
+    total_turns = 0
+    unfinished = 0
+    done = 0
+    while done < games:
+        n = min(batch, games - done)
+        sim = BatchGame(n, active_colors, policies, seed=rng.integers(2 ** 63)).run(max_turns)
+        finished = sim.winner >= 0
+        wins += np.bincount(sim.winner[finished], minlength=4)
+        total_turns += int(sim.turns[finished].sum())
+        unfinished += int((~finished).sum())
+        done += n
+    played = games - unfinished
+    return dict(zip(COLORS, wins.tolist())), total_turns / max(played, 1), unfinished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vectorized Ludo self-play")
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--players', type=int, choices=(2, 4), default=4)
+    parser.add_argument('--batch', type=int, default=100000, help="games stepped together")
+    parser.add_argument('--seed', type=int, default=None)
+    for color in COLORS:
+        parser.add_argument(f'--{color}', choices=POLICIES, default='heuristic')
+    args = parser.parse_args(argv)
+
+    active_colors = seat_colors(args.players)
+    policies = {c: getattr(args, c) for c in active_colors}
+
+    started = time.perf_counter()
+    wins, mean_turns, unfinished = simulate(args.games, active_colors, policies, args.seed, args.batch)
+    elapsed = time.perf_counter() - started
+
+    print(f"🎲 {args.games} games, {args.players} players, {elapsed:.2f}s ({args.games / elapsed:,.0f} games/s)")
+    for color in active_colors:
+        print(f"  {color:<7} {policies[color]:<10} {wins[color] / args.games:7.2%}")
+    print(f"  avg rolls per game: {mean_turns:.1f}, unfinished: {unfinished}")
+
+
+if __name__ == '__main__':
+    main()
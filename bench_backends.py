@@ -0,0 +1,107 @@
+"""Compare async backends under concurrent connections.
+
+For each ASYNC_MODE this starts `python app.py` on a spare port, connects
+--clients Socket.IO clients at once, starts a local game on each and times
+roll_dice -> update_state round trips. Needs python-socketio's client
+extras (`pip install "python-socketio[client]"`) and, for gevent,
+`pip install gevent gevent-websocket`.
+
+    python bench_backends.py --clients 200 --rolls 5 eventlet gevent threading
+
+For online rooms, many concurrent games and memory growth see loadgen.py.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import socketio
+
+from loadgen import free_port, percentile, start_server
+
+
+def run_client(url, rolls, latencies, failures):
+    """Play a local game, timing each roll until its update arrives"""
+    client = socketio.Client(reconnection=False)
+    state = {}
+    rolled = threading.Event()
+    ready = threading.Event()   # the dice are waiting for a roll
+    room = {}
+
+    @client.on('room_assigned')
+    def on_room(data):
+        room['code'] = data['room_code']
+
+    @client.on('update_state')
+    def on_update(msg):
+        if msg['seq'] <= state.get('seq', -1):
+            return  # the snapshot that follows our own start_game delta
+        state['seq'] = msg['seq']
+        state.update(msg.get('full') or msg['patch'])
+        if state.get('rolled_value') is not None:
+            rolled.set()
+        elif 'TO ROLL' in state.get('log', '') or 'EXTRA TURN' in state.get('log', ''):
+            ready.set()
+
+    try:
+        client.connect(url, transports=['websocket'], wait_timeout=10)
+        client.emit('start_game', {'mode': 'multiplayer', 'num_players': 2})
+        for _ in range(rolls):
+            if not ready.wait(10):
+                failures.append('stalled')
+                break
+            ready.clear()
+            rolled.clear()
+            started = time.perf_counter()
+            client.emit('roll_dice', {'room_code': room.get('code')})
+            if not rolled.wait(10):
+                failures.append('timeout')
+                break
+            latencies.append(time.perf_counter() - started)
+            if state.get('can_move'):
+                # any token will do; illegal picks are ignored and retried
+                for token in range(4):
+                    client.emit('move_token', {'room_code': room['code'], 'token_index': token})
+    except Exception as exc:
+        failures.append(type(exc).__name__)
+    finally:
+        client.disconnect()
+
+
+def bench(mode, clients, rolls):
+    port = free_port()
+    server = start_server(mode, port, BROADCAST_INTERVAL='0')
+    latencies, failures = [], []
+    try:
+        threads = [threading.Thread(target=run_client, args=(f"http://127.0.0.1:{port}", rolls, latencies, failures))
+                   for _ in range(clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return latencies, failures, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Ludo async backends")
+    parser.add_argument('modes', nargs='*', default=['eventlet', 'gevent', 'threading'])
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--rolls', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10} {'clients':>7} {'ok':>6} {'failed':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode in args.modes:
+        latencies, failures, _ = bench(mode, args.clients, args.rolls)
+        ms = sorted(x * 1000 for x in latencies) or [float('nan')]
+        p99 = percentile(ms, 0.99)
+        print(f"{mode:<10} {args.clients:>7} {len(latencies):>6} {len(failures):>6} "
+              f"{statistics.median(ms):>8.1f} {p99:>8.1f} {ms[-1]:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Bounded worker pool for computer-opponent decisions.
+
+Searching for a bot move costs real CPU (up to a second for the expert
+level). Done inline it would stall the Socket.IO worker and every other
+room's updates with it, so decisions run in separate processes instead.
+
+A room has at most one decision in flight. submit() starts it as soon as
+the bot has rolled, so the search overlaps the pause before the move is
+shown; result() is polled from the scheduler and answers PENDING until
+the worker is done. A job is dropped (and the caller falls back to the
+simple heuristic) when:
+
+    - the room is cancelled: the game restarted or the room was evicted
+    - the position changed since the job was submitted (stale)
+    - the job ran past the timeout, or the worker failed
+    - the queue already holds max_jobs decisions (rejected)
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import random
+import threading
+import time
+
+import bots
+
+log = logging.getLogger('ludo.bots')
+
+PENDING = object()
+
+
+class BotJob:
+    __slots__ = ('future', 'position', 'submitted')
+
+    def __init__(self, future, position, submitted):
+        self.future = future
+        self.position = position
+        self.submitted = submitted
+
+
+class BotPool:
+    """room_code -> in-flight decision, run on a lazily started process pool
+
+    on_decision(seconds), if given, is called as each job finishes with the
+    time from submit() to the worker's answer.
+    """
+
+    def __init__(self, workers=bots.BOT_WORKERS, max_jobs=None, timeout=3.0, clock=time.monotonic,
+                 on_decision=None):
+        self.workers = workers
+        self.max_jobs = max_jobs or workers * 8
+        self.timeout = timeout
+        self.clock = clock
+        self.on_decision = on_decision
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'cancelled': 0, 'stale': 0,
+                      'timed_out': 0, 'failed': 0, 'rejected': 0}
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def submit(self, room_code, state):
+        """Start choosing a move for the player to move; False if the queue is full"""
+        self.cancel(room_code)
+        position = bots.position_of(state)
+        with self._lock:
+            if len(self._jobs) >= self.max_jobs:
+                self.stats['rejected'] += 1
+                return False
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            executor = self._executor
+        try:
+            future = executor.submit(bots.decide, position, state.difficulty, random.getrandbits(32))
+        except (BrokenProcessPool, RuntimeError):
+            self._reset(executor)
+            self.stats['failed'] += 1
+            return False
+        submitted = self.clock()
+        if self.on_decision is not None:
+            future.add_done_callback(
+                lambda f: f.cancelled() or self.on_decision(self.clock() - submitted))
+        with self._lock:
+            self._jobs[room_code] = BotJob(future, position, submitted)
+            self.stats['submitted'] += 1
+        return True
+
+    def cancel(self, room_code):
+        """Forget the room's decision, if any; a queued job never runs"""
+        with self._lock:
+            job = self._jobs.pop(room_code, None)
+            if job:
+                self.stats['cancelled'] += 1
+        if job:
+            job.future.cancel()
+
+    def result(self, room_code, state):
+        """The chosen token, PENDING while the worker thinks, or None to fall back"""
+        with self._lock:
+            job = self._jobs.get(room_code)
+            if job is None:
+                return None
+            if not job.future.done() and self.clock() - job.submitted < self.timeout:
+                return PENDING
+            del self._jobs[room_code]
+
+        if not job.future.done():
+            self.stats['timed_out'] += 1
+            job.future.cancel()
+            return None
+        if job.position != bots.position_of(state):
+            self.stats['stale'] += 1
+            return None
+        try:
+            chosen = job.future.result()
+        except BrokenProcessPool:
+            self.stats['failed'] += 1
+            self._reset(self._executor)
+            return None
+        except Exception:
+            self.stats['failed'] += 1
+            log.exception("bot decision failed")
+            return None
+        self.stats['completed'] += 1
+        return chosen
+
+    def metrics(self):
+        """Queue depth and job counters for /health"""
+        with self._lock:
+            futures = [job.future for job in self._jobs.values()]
+        running = sum(1 for f in futures if f.running())
+        return {'workers': self.workers, 'max_jobs': self.max_jobs, 'in_flight': len(futures),
+                'running': running, 'queued': len(futures) - running, **self.stats}
+
+    def _reset(self, executor):
+        """Throw away a broken executor; the next submit starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,302 @@
+"""Search-based computer opponent.
+
+The original bot (engine.heuristic_move) brings a token out on a six and
+otherwise pushes its leading token, blind to captures and danger. This
+module searches instead: expectimax over the six dice outcomes, playing
+every legal move of every player with the engine's own rules, and scoring
+the leaves with evaluate().
+
+Opponents are assumed to play against the bot (their move minimises the
+bot's score), so a four player game is searched as the bot vs. everyone.
+
+Each decision gets a node and wall-clock budget. The search deepens one
+ply at a time and keeps the best move of the last ply that finished, so
+running out of budget costs strength, never a late answer. Positions are
+memoised in a shared, bounded transposition table.
+
+The expert level scores moves by Monte Carlo instead: many heuristic
+playouts to the end of the game per legal move, stopping early once one
+move is clearly ahead or the time budget runs out. Like every decision
+it runs in a bot_pool worker, so rooms are spread over the cores.
+"""
+from array import array
+from collections import OrderedDict
+import math
+import os
+import random
+import threading
+import time
+
+import engine
+from engine import HOME, FINISHED, TRACK_LEN, SAFE_POSITIONS
+
+# depth: plies searched after the bot's own move
+# nodes, seconds: hard per-decision budget
+LEVELS = {
+    'easy': None,   # the original heuristic
+    'medium': {'depth': 1, 'nodes': 2000, 'seconds': 0.05},
+    'hard': {'depth': 3, 'nodes': 50000, 'seconds': 0.25},
+    # playouts: per legal move at most, in batches of `batch`
+    'expert': {'playouts': 2000, 'batch': 100, 'seconds': 1.0},
+}
+DEFAULT_LEVEL = 'easy'
+
+WIN_SCORE = 10000.0
+FINISHED_SCORE = 70.0   # worth a bit more than a token one step from the centre
+OUT_BONUS = 5.0         # a token on the board is worth more than one in the yard
+SAFE_BONUS = 3.0
+SAFE_SQUARES = frozenset(SAFE_POSITIONS)
+
+BOT_WORKERS = int(os.environ.get('BOT_WORKERS', '0')) or os.cpu_count() or 1
+PLAYOUT_MAX_TURNS = 2000
+CONFIDENCE = 2.0  # standard errors between the best move and the rest to stop early
+
+
+class OutOfBudget(Exception):
+    pass
+
+
+class TranspositionTable:
+    """Bounded, thread-safe position -> value cache with LRU eviction"""
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+table = TranspositionTable()
+
+
+def _color_score(state, color):
+    """Material for one color: progress, safety and danger"""
+    squares = state.board.squares
+    score = 0.0
+    for pos in state.tokens_of(color):
+        if pos == HOME:
+            continue
+        if pos == FINISHED:
+            score += FINISHED_SCORE
+            continue
+        value = pos + OUT_BONUS
+        score += value
+        if pos >= TRACK_LEN or pos in SAFE_SQUARES:
+            score += SAFE_BONUS  # home column or safe square: cannot be captured
+            continue
+        square = engine.square_of(color, pos)
+        threats = 0
+        for back in range(1, 7):
+            for other, _ in squares.get((square - back) % TRACK_LEN, ()):
+                if other != color:
+                    threats += 1
+        if threats:
+            score -= value * min(threats, 6) / 6
+    return score
+
+
+def evaluate(state, me):
+    """Static score of a position from me's point of view"""
+    mine = _color_score(state, me)
+    others = [_color_score(state, color) for color in state.active_colors if color != me]
+    return mine - (sum(others) / len(others) if others else 0.0)
+
+
+class Search:
+    """One budgeted decision for the player to move"""
+
+    def __init__(self, me, nodes, seconds, tt=table):
+        self.me = me
+        self.max_nodes = nodes
+        self.deadline = time.monotonic() + seconds
+        self.tt = tt
+        self.nodes = 0
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes >= self.max_nodes or (self.nodes & 63 == 0 and time.monotonic() >= self.deadline):
+            raise OutOfBudget()
+
+    def _key(self, state, depth):
+        return (state.tokens.tobytes(), state.turn, state.active_colors, state.board.blockades, self.me, depth)
+
+    def move_value(self, state, token_idx, depth):
+        """Value of playing token_idx with the rolled value, then depth more plies"""
+        self._tick()
+        child = state.clone()
+        result = engine.apply(child, token_idx)
+        if result['won']:
+            return WIN_SCORE if child.turn == self.me else -WIN_SCORE
+        engine.end_move(child, result)
+        if not result['extra_turn']:
+            engine.next_turn(child)
+        return self.chance(child, depth)
+
+    def chance(self, state, depth):
+        """Expected value over the next roll of the player to move"""
+        if depth <= 0:
+            return evaluate(state, self.me)
+        key = self._key(state, depth)
+        cached = self.tt.get(key)
+        if cached is not None:
+            return cached
+
+        total = 0.0
+        for roll in range(1, 7):
+            state.rolled_value = roll
+            moves = engine.legal_moves(state, roll)
+            if not moves:
+                self._tick()
+                child = state.clone()
+                engine.next_turn(child)
+                total += self.chance(child, depth - 1)
+                continue
+            values = [self.move_value(state, i, depth - 1) for i in moves]
+            total += max(values) if state.turn == self.me else min(values)
+        state.rolled_value = None
+
+        value = total / 6
+        self.tt.put(key, value)
+        return value
+
+
+def choose_move(state, rng=random, level=None):
+    """Token index for the player to move with state.rolled_value, or None
+
+    level is a LEVELS name and defaults to the room's difficulty. Same
+    signature as the engine's policies, so it drops into play_game().
+    """
+    moves = engine.legal_moves(state, state.rolled_value)
+    if not moves:
+        return None
+    settings = LEVELS.get(level or state.difficulty)
+    if settings is None or len(moves) == 1:
+        return engine.heuristic_move(state, rng)
+    if 'playouts' in settings:
+        return rollout_move(state, moves, settings, rng)
+
+    # Search on a copy: chance() writes rolled_value while it explores
+    search = Search(state.turn, settings['nodes'], settings['seconds'])
+    root = state.clone()
+    best = None
+    try:
+        for depth in range(settings['depth'] + 1):
+            scored = [(search.move_value(root, i, depth), i) for i in moves]
+            best = max(scored, key=lambda s: s[0])[1]
+    except OutOfBudget:
+        pass
+    return best if best is not None else engine.heuristic_move(state, rng)
+
+
+def position_of(state):
+    """Picklable copy of what a playout needs"""
+    return (state.tokens.tobytes(), state.active_colors, state.turn, state.rolled_value, state.board.blockades)
+
+
+def restore(position):
+    tokens, active_colors, turn, roll, blockades = position
+    state = engine.GameState()
+    state.tokens = array('b', tokens)
+    state.active_colors = active_colors
+    state.turn = turn
+    state.rolled_value = roll
+    state.game_started = True
+    state.board = engine.Board(blockades)
+    state.board.rebuild(state)
+    return state
+
+
+def playouts(root, token_idx, count, rng, deadline):
+    """(wins, games) for the player to move over up to count heuristic games after playing token_idx
+
+    Stops early at deadline, so a batch never runs far past the budget.
+    """
+    player = root.turn
+    wins = games = 0
+    while games < count and time.monotonic() < deadline:
+        games += 1
+        state = root.clone()
+        result = engine.apply(state, token_idx)
+        if result['won']:
+            wins += 1
+            continue
+        engine.end_move(state, result)
+        if not result['extra_turn']:
+            engine.next_turn(state)
+        for _ in range(PLAYOUT_MAX_TURNS):
+            mover = state.turn
+            result = engine.play_turn(state, engine.heuristic_move, rng)
+            if result and result['won']:
+                wins += mover == player
+                break
+    return wins, games
+
+
+def _separated(wins, counts, best):
+    """Whether best's win rate is CONFIDENCE standard errors clear of every other move"""
+    def bounds(i):
+        rate = wins[i] / counts[i]
+        err = CONFIDENCE * math.sqrt(max(rate * (1 - rate), 0.25 / counts[i]) / counts[i])
+        return rate - err, rate + err
+    low = bounds(best)[0]
+    return all(bounds(i)[1] < low for i in wins if i != best)
+
+
+def rollout_move(state, moves, settings, rng=random):
+    """Monte Carlo choice among moves; the heuristic if some move got no playout in time"""
+    batch = settings['batch']
+    rounds = max(1, settings['playouts'] // batch)
+    deadline = time.monotonic() + settings['seconds']
+    wins = dict.fromkeys(moves, 0)
+    counts = dict.fromkeys(moves, 0)
+
+    for _ in range(rounds):
+        for i in moves:
+            won, played = playouts(state, i, batch, rng, deadline)
+            wins[i] += won
+            counts[i] += played
+        if time.monotonic() >= deadline:
+            break
+        best = max(moves, key=lambda i: wins[i] / counts[i])
+        if _separated(wins, counts, best):
+            break
+
+    scored = [i for i in moves if counts[i]]
+    if len(scored) < len(moves):
+        return engine.heuristic_move(state, rng)
+    return max(scored, key=lambda i: wins[i] / counts[i])
+
+
+def decide(position, level, seed):
+    """Bot worker entry point: choose a move for a position from position_of()"""
+    return choose_move(restore(position), random.Random(seed), level)
+
+
+def policy(level):
+    """A play_game() policy playing at a fixed level"""
+    return lambda state, rng=random: choose_move(state, rng, level)
@@ -0,0 +1,467 @@
+"""Headless Ludo rules engine.
+
+Everything in here is pure game logic: no Flask, no Socket.IO, no sleeping.
+The socket handlers in app.py are thin adapters that call into these
+functions and decide what to emit and when.
+"""
+from array import array
+import random
+
+COLORS = ['red', 'green', 'yellow', 'blue']
+COLOR_INDEX = {color: i for i, color in enumerate(COLORS)}
+ALL_COLORS_MASK = (1 << len(COLORS)) - 1
+PATH_START = {'red': 0, 'green': 13, 'yellow': 26, 'blue': 39}
+OPPOSITE = {'red': 'yellow', 'yellow': 'red', 'green': 'blue', 'blue': 'green'}
+SAFE_POSITIONS = [0, 8, 13, 21, 26, 34, 39, 47]
+
+HOME = -1          # token still in the yard
+FINISH = 57        # steps from path start to the centre
+FINISHED = 99      # token has reached the centre
+TRACK_LEN = 52     # squares on the shared outer track
+
+# Scalar fields the browser tracks; update_state patches carry only the
+# ones that changed since the previous broadcast
+SYNC_FIELDS = ('mode', 'num_players', 'active_colors', 'user_color', 'turn', 'rolled_value',
+               'can_move', 'log', 'game_started', 'room_code', 'connected_players')
+
+
+MASK64 = (1 << 64) - 1
+
+
+class Dice:
+    """Seedable per-room dice (splitmix64)
+
+    The whole generator state is one 64-bit integer, so a snapshot can
+    store it and a replayed room rolls exactly what the original did.
+    Same randint() as the random module, so it can stand in as an rng.
+    """
+    __slots__ = ('state',)
+
+    def __init__(self, seed=None):
+        self.state = (random.getrandbits(64) if seed is None else seed) & MASK64
+
+    def next64(self):
+        self.state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def randint(self, a, b):
+        return a + self.next64() % (b - a + 1)
+
+
+def square_of(color, pos):
+    """Absolute outer-track square of a token, or None off the track"""
+    if 0 <= pos < TRACK_LEN:
+        return (PATH_START[color] + pos) % TRACK_LEN
+    return None
+
+
+class Board:
+    """Occupancy index: which tokens sit on each absolute outer-track square
+
+    Kept in step with the token lists by start() and apply(), so captures
+    and blockade checks are a dict lookup instead of a scan over every
+    opponent token. Only occupied squares are stored.
+    """
+    __slots__ = ('squares', 'blockades')
+
+    def __init__(self, blockades=False):
+        self.squares = {}
+        self.blockades = blockades  # two same-color tokens block opponents
+
+    def place(self, color, idx, pos):
+        square = square_of(color, pos)
+        if square is not None:
+            self.squares.setdefault(square, []).append((color, idx))
+
+    def remove(self, color, idx, pos):
+        square = square_of(color, pos)
+        if square is not None:
+            occupants = self.squares[square]
+            occupants.remove((color, idx))
+            if not occupants:
+                del self.squares[square]
+
+    def at(self, square):
+        """Tokens on a square as (color, token index) pairs"""
+        return self.squares.get(square, ())
+
+    def blocker(self, square):
+        """Color holding a blockade on square, if any"""
+        occupants = self.squares.get(square, ())
+        if len(occupants) >= 2:
+            colors = [c for c, _ in occupants]
+            for color in colors:
+                if colors.count(color) >= 2:
+                    return color
+        return None
+
+    def blocked(self, color, pos, roll):
+        """Whether an opponent blockade stops color moving from pos by roll"""
+        if not self.blockades:
+            return False
+        start = 0 if pos == HOME else pos + 1
+        end = 0 if pos == HOME else min(pos + roll, TRACK_LEN - 1)
+        for step in range(start, end + 1):
+            owner = self.blocker((PATH_START[color] + step) % TRACK_LEN)
+            if owner is not None and owner != color:
+                return True
+        return False
+
+    def rebuild(self, state):
+        """Re-index from the token lists, e.g. after editing them directly"""
+        self.squares = {}
+        for color in state.active_colors:
+            for idx, pos in enumerate(state.tokens_of(color)):
+                self.place(color, idx, pos)
+
+
+class GameState:
+    """One room's game, packed into slots
+
+    Token positions for all four colors live in a single 16-byte signed
+    array (color-major, see COLOR_INDEX), the session map is only created
+    once someone joins online, and the nested dict the browser expects is
+    built on demand by to_dict().
+
+    seq counts broadcasts; sent remembers what the last one contained so
+    delta() can send only the fields and colors that changed.
+    """
+    __slots__ = ('mode', 'num_players', 'active_colors', 'user_color', 'turn',
+                 'rolled_value', 'can_move', 'tokens', 'log', 'game_started',
+                 'room_code', 'player_sessions', 'open_colors', 'board', 'seq', 'sent',
+                 'difficulty', 'dice', 'event_seq')
+
+    def __init__(self):
+        self.mode = None
+        self.num_players = 4
+        self.active_colors = ()
+        self.user_color = None
+        self.turn = None
+        self.rolled_value = None
+        self.can_move = False
+        self.tokens = array('b', [HOME] * 16)
+        self.log = "Waiting for game to start..."
+        self.game_started = False
+        self.room_code = None
+        self.player_sessions = None  # sid -> color, online rooms only
+        self.open_colors = ALL_COLORS_MASK  # bit COLOR_INDEX[c] set while c is free
+        self.board = Board()
+        self.seq = 0
+        self.sent = None
+        self.difficulty = 'easy'  # computer opponent strength, see bots.LEVELS
+        self.dice = Dice()
+        self.event_seq = 0  # events recorded for this room, see event_log.py
+
+    @property
+    def turn_order(self):
+        return self.active_colors
+
+    @property
+    def connected_players(self):
+        return len(self.player_sessions) if self.player_sessions else 0
+
+    def tokens_of(self, color):
+        """Copy of one color's four token positions"""
+        base = COLOR_INDEX[color] * 4
+        return self.tokens[base:base + 4].tolist()
+
+    def seated_colors(self):
+        return list(self.player_sessions.values()) if self.player_sessions else []
+
+    def color_of(self, sid):
+        return self.player_sessions.get(sid) if self.player_sessions else None
+
+    def is_open(self, color):
+        return bool(self.open_colors >> COLOR_INDEX[color] & 1)
+
+    def available_colors(self):
+        return [color for color in COLORS if self.open_colors >> COLOR_INDEX[color] & 1]
+
+    def seat(self, sid, color):
+        if self.player_sessions is None:
+            self.player_sessions = {}
+        self.unseat(sid)
+        self.player_sessions[sid] = color
+        self.open_colors &= ~(1 << COLOR_INDEX[color])
+
+    def unseat(self, sid):
+        """Remove a session and return the color it held, if any"""
+        if not self.player_sessions:
+            return None
+        color = self.player_sessions.pop(sid, None)
+        if color is not None:
+            self.open_colors |= 1 << COLOR_INDEX[color]
+        return color
+
+    def clone(self):
+        """Copy of the game position only (no sessions or broadcast state), for search"""
+        copy = GameState.__new__(GameState)
+        copy.mode = self.mode
+        copy.num_players = self.num_players
+        copy.active_colors = self.active_colors
+        copy.user_color = self.user_color
+        copy.turn = self.turn
+        copy.rolled_value = self.rolled_value
+        copy.can_move = self.can_move
+        copy.tokens = array('b', self.tokens)
+        copy.log = self.log
+        copy.game_started = self.game_started
+        copy.room_code = None
+        copy.player_sessions = None
+        copy.open_colors = self.open_colors
+        copy.board = Board(self.board.blockades)
+        copy.board.squares = {square: list(occupants) for square, occupants in self.board.squares.items()}
+        copy.seq = 0
+        copy.sent = None
+        copy.difficulty = self.difficulty
+        copy.dice = None  # search never rolls; roll_dice() falls back to random
+        copy.event_seq = 0
+        return copy
+
+    def to_dict(self):
+        """The JSON shape the browser client renders"""
+        return {
+            'mode': self.mode,
+            'num_players': self.num_players,
+            'active_colors': list(self.active_colors),
+            'user_color': self.user_color,
+            'turn': self.turn,
+            'rolled_value': self.rolled_value,
+            'can_move': self.can_move,
+            'players': {
+                color: {'tokens': self.tokens_of(color), 'path_start': PATH_START[color]}
+                for color in COLORS
+            },
+            'log': self.log,
+            'game_started': self.game_started,
+            'turn_order': list(self.active_colors),
+            'room_code': self.room_code,
+            'connected_players': self.connected_players
+        }
+
+    def snapshot(self):
+        """A full update_state payload at the current sequence number"""
+        return {'seq': self.seq, 'full': self.to_dict()}
+
+    def delta(self):
+        """An update_state patch of what changed since the last delta, or None"""
+        current = tuple(getattr(self, field) for field in SYNC_FIELDS) + (self.tokens.tobytes(),)
+        previous = self.sent
+        if current == previous:
+            return None
+
+        patch = {}
+        for i, field in enumerate(SYNC_FIELDS):
+            if previous is None or previous[i] != current[i]:
+                patch[field] = list(current[i]) if field == 'active_colors' else current[i]
+        moved = {}
+        for color, i in COLOR_INDEX.items():
+            if previous is None or previous[-1][i * 4:i * 4 + 4] != current[-1][i * 4:i * 4 + 4]:
+                moved[color] = self.tokens_of(color)
+        if moved:
+            patch['tokens'] = moved
+
+        self.seq += 1
+        self.sent = current
+        return {'seq': self.seq, 'patch': patch}
+
+
+def create_game_state():
+    """Create a fresh game state"""
+    return GameState()
+
+
+def seat_colors(num_players, mode=None, user_color=None):
+    """Default seating for a local game: opposite corners for 2 players"""
+    if num_players == 2:
+        if mode == 'computer' and user_color:
+            return [user_color, OPPOSITE[user_color]]
+        return ['red', 'yellow']
+    return COLORS[:]
+
+
+def start(state, active_colors):
+    """Reset tokens and turn order for a new game between active_colors"""
+    state.active_colors = tuple(active_colors)
+    for color in state.active_colors:
+        base = COLOR_INDEX[color] * 4
+        state.tokens[base:base + 4] = array('b', [HOME] * 4)
+    state.board.rebuild(state)
+    state.turn = state.turn_order[0]
+    state.rolled_value = None
+    state.can_move = False
+    state.game_started = True
+    state.log = f"🎮 {state.turn.upper()}'s TURN - CLICK DICE TO ROLL!"
+
+
+def is_bot_turn(state):
+    """True when the computer opponent is the one to act"""
+    return state.mode == 'computer' and state.turn != state.user_color
+
+
+def can_move(pos, roll):
+    """Whether a token at pos may move with this roll"""
+    return (pos == HOME and roll == 6) or (pos >= 0 and pos + roll <= FINISH)
+
+
+def legal_moves(state, roll):
+    """Token indices the player to move may play with this roll"""
+    player = state.turn
+    tokens = state.tokens_of(player)
+    moves = [i for i, t in enumerate(tokens) if can_move(t, roll)]
+    board = state.board
+    if board.blockades:
+        moves = [i for i in moves if not board.blocked(player, tokens[i], roll)]
+    return moves
+
+
+def roll_dice(state, value=None, rng=None):
+    """Record a roll for the current player and return the legal moves
+
+    The roll comes from rng if given, else the room's own dice. When
+    nothing can move, can_move stays False and the caller is expected to
+    hand the turn on with next_turn().
+    """
+    val = value if value is not None else (rng or state.dice or random).randint(1, 6)
+    state.rolled_value = val
+    state.log = f"🎲 {state.turn.upper()} ROLLED {val}!"
+
+    moves = legal_moves(state, val)
+    if moves:
+        state.can_move = True
+        state.log += " ✅ CLICK A TOKEN TO MOVE!"
+    else:
+        state.log += " ❌ NO VALID MOVES!"
+    return moves
+
+
+def apply(state, token_idx):
+    """Move token_idx of the current player by the rolled value
+
+    Returns None for an illegal move, otherwise a dict with 'captured',
+    'won' and 'extra_turn'. The roll is left on the state so the caller can
+    show the move before calling end_move().
+    """
+    player = state.turn
+    tokens = state.tokens
+    base = COLOR_INDEX[player] * 4
+    board = state.board
+    roll = state.rolled_value
+    captured = False
+
+    if not 0 <= token_idx < 4:
+        return None
+    old_pos = tokens[base + token_idx]
+    if roll is None or not can_move(old_pos, roll) or board.blocked(player, old_pos, roll):
+        return None
+
+    if old_pos == HOME:
+        new_pos = 0
+        state.log = f"🚀 {player.upper()} BROUGHT TOKEN OUT!"
+    else:
+        new_pos = old_pos + roll
+        if new_pos == FINISH:
+            new_pos = FINISHED
+        state.log = f"🎯 {player.upper()} MOVED!"
+    tokens[base + token_idx] = new_pos
+    board.remove(player, token_idx, old_pos)
+    board.place(player, token_idx, new_pos)
+
+    if 0 <= new_pos < TRACK_LEN and new_pos not in SAFE_POSITIONS:
+        order = state.active_colors
+        victims = sorted(((c, i) for c, i in board.at(square_of(player, new_pos)) if c != player),
+                         key=lambda v: (order.index(v[0]), v[1]))
+        for opp, i in victims:
+            slot = COLOR_INDEX[opp] * 4 + i
+            board.remove(opp, i, tokens[slot])
+            tokens[slot] = HOME
+            captured = True
+            state.log = f"⚔️ {player.upper()} CAPTURED {opp.upper()}!"
+
+    won = all(t == FINISHED for t in tokens[base:base + 4])
+    if won:
+        state.log = f"🏆 {player.upper()} WINS! 🎉🎉🎉"
+        state.game_started = False
+
+    return {'captured': captured, 'won': won, 'extra_turn': not won and (roll == 6 or captured)}
+
+
+def winner(state):
+    """Color with every token home in the centre, if any"""
+    for color in state.active_colors:
+        if all(t == FINISHED for t in state.tokens_of(color)):
+            return color
+    return None
+
+
+def end_move(state, result):
+    """Clear the roll after a move; the same player goes again on an extra turn"""
+    state.rolled_value = None
+    state.can_move = False
+    if result['extra_turn']:
+        state.log = f"🔄 {state.turn.upper()} GETS EXTRA TURN!"
+
+
+def next_turn(state):
+    """Pass the dice to the next color in turn order"""
+    order = state.turn_order
+    state.turn = order[(order.index(state.turn) + 1) % len(order)]
+    state.rolled_value = None
+    state.can_move = False
+    state.log = f"👉 {state.turn.upper()}'s TURN - CLICK DICE TO ROLL!"
+
+
+def heuristic_move(state, rng=random):
+    """The original bot: bring a token out on a six, else advance the leader"""
+    tokens = state.tokens_of(state.turn)
+    roll = state.rolled_value
+    movable = legal_moves(state, roll)
+    if not movable:
+        return None
+
+    home_tokens = [i for i in movable if tokens[i] == HOME]
+    if home_tokens and roll == 6:
+        return rng.choice(home_tokens)
+    return max(movable, key=lambda i: tokens[i] if tokens[i] >= 0 else -100)
+
+
+def random_move(state, rng=random):
+    """Pick any legal move"""
+    movable = legal_moves(state, state.rolled_value)
+    return rng.choice(movable) if movable else None
+
+
+def play_turn(state, policy=heuristic_move, rng=random):
+    """Roll, move and hand over the dice for one player; returns apply()'s result"""
+    moves = roll_dice(state, rng=rng)
+    if not moves:
+        next_turn(state)
+        return None
+
+    result = apply(state, policy(state, rng))
+    if result['won']:
+        return result
+    end_move(state, result)
+    if not result['extra_turn']:
+        next_turn(state)
+    return result
+
+
+def play_game(active_colors, policies=None, rng=random, max_turns=10000):
+    """Play a full game without any I/O and return (winner, turns)
+
+    policies maps color to a move policy; colors without one use the
+    heuristic bot. winner is None if max_turns runs out first.
+    """
+    policies = policies or {}
+    state = create_game_state()
+    start(state, active_colors)
+    for turns in range(1, max_turns + 1):
+        player = state.turn
+        result = play_turn(state, policies.get(player, heuristic_move), rng)
+        if result and result['won']:
+            return player, turns
+    return None, max_turns
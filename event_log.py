@@ -0,0 +1,243 @@
+"""Append-only binary event log with room snapshots and replay.
+
+Every roll, move and turn hand-over in an online room is appended to one
+log file as a fixed 16-byte record:
+
+    room code  6s   seq  I   kind  B   color  B   roll  B   token  b   result  B   (pad)
+
+and about every SNAPSHOT_EVERY events (and whenever a game starts) a 48-byte
+snapshot of the room goes to a second file next to it (<path>.snap). A
+snapshot holds the token array, turn order, flags and the room's dice
+state, so rebuild() can load the latest snapshot of a room and replay the
+records after it. Dice come from the room's engine.Dice, so a replay rolls
+the same values and checks every recorded result along the way.
+
+Records never change size, so both files can be memory-mapped and scanned
+record by record; a torn record at the end of a crashed write is
+ignored. LOCAL_ rooms live only as long as their socket and aren't logged.
+
+    python event_log.py ludo-events.bin ABC123     # replay one room, print its events
+"""
+import argparse
+from array import array
+import mmap
+import os
+import struct
+import threading
+
+import bots
+import engine
+
+SNAPSHOT_EVERY = 64
+
+ROLL, MOVE, PASS = 1, 2, 3
+KIND_NAMES = {ROLL: 'roll', MOVE: 'move', PASS: 'pass'}
+CAPTURED, WON, EXTRA_TURN = 1, 2, 4
+NO_COLOR = 255
+
+EVENT = struct.Struct('<6sIBBBbBx')
+SNAPSHOT = struct.Struct('<6sIBBB4sBBBB16sQ3x')
+
+MODES = (None, 'computer', 'multiplayer')
+DIFFICULTIES = tuple(bots.LEVELS)
+
+
+class ReplayError(Exception):
+    """The log disagrees with the rules or the dice: corrupt or out of order"""
+
+
+def _color_code(color):
+    return engine.COLOR_INDEX[color] if color else NO_COLOR
+
+
+def _color(code):
+    return engine.COLORS[code] if code != NO_COLOR else None
+
+
+def _flags(result):
+    return ((CAPTURED if result['captured'] else 0) | (WON if result['won'] else 0)
+            | (EXTRA_TURN if result['extra_turn'] else 0))
+
+
+def pack_snapshot(room_code, state):
+    order = bytes(_color_code(c) for c in state.active_colors).ljust(4, bytes([NO_COLOR]))
+    flags = (1 if state.can_move else 0) | (2 if state.game_started else 0)
+    return SNAPSHOT.pack(room_code.encode(), state.event_seq, MODES.index(state.mode) if state.mode in MODES else 0,
+                         state.num_players, _color_code(state.user_color), order, _color_code(state.turn),
+                         state.rolled_value or 0, flags,
+                         DIFFICULTIES.index(state.difficulty) if state.difficulty in DIFFICULTIES else 0,
+                         state.tokens.tobytes(), state.dice.state)
+
+
+def state_from_snapshot(fields):
+    """GameState from an unpacked snapshot record (no sessions: players rejoin)"""
+    (room, event_seq, mode, num_players, user_color, order, turn, rolled, flags, difficulty,
+     tokens, dice) = fields
+    state = engine.create_game_state()
+    state.room_code = room.decode()
+    state.event_seq = event_seq
+    state.mode = MODES[mode]
+    state.num_players = num_players
+    state.user_color = _color(user_color)
+    state.active_colors = tuple(_color(c) for c in order if c != NO_COLOR)
+    state.turn = _color(turn)
+    state.rolled_value = rolled or None
+    state.can_move = bool(flags & 1)
+    state.game_started = bool(flags & 2)
+    state.difficulty = DIFFICULTIES[difficulty]
+    state.tokens = array('b', tokens)
+    state.dice = engine.Dice(dice)
+    state.board.rebuild(state)
+    return state
+
+
+def _records(path, struct_, start=0):
+    """Every complete record in a log file from byte offset start on, via mmap"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    if size < start + struct_.size:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset in range(start, size - struct_.size + 1, struct_.size):
+            yield struct_.unpack_from(mapped, offset)
+
+
+def apply_event(state, kind, color, roll, token, flags):
+    """Replay one record on state, checking it against the rules"""
+    if kind == ROLL:
+        if state.turn != color:
+            raise ReplayError(f"{color} rolled on {state.turn}'s turn")
+        value = state.dice.randint(1, 6)
+        if value != roll:
+            raise ReplayError(f"dice gave {value}, log says {roll}")
+        engine.roll_dice(state, value)
+    elif kind == MOVE:
+        result = engine.apply(state, token)
+        if result is None or _flags(result) != flags:
+            raise ReplayError(f"move of {color} token {token} does not replay")
+        if not result['won']:
+            engine.end_move(state, result)
+    elif kind == PASS:
+        engine.next_turn(state)
+        if state.turn != color:
+            raise ReplayError(f"turn passed to {state.turn}, log says {color}")
+    else:
+        raise ReplayError(f"unknown event kind {kind}")
+    state.event_seq += 1
+
+
+class EventLog:
+    """Appends a room's events and snapshots; a None path disables logging"""
+
+    def __init__(self, path=None, snapshot_every=SNAPSHOT_EVERY):
+        self.path = path
+        self.snapshot_path = f"{path}.snap" if path else None
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._events = open(path, 'ab') if path else None
+        self._snapshots = open(self.snapshot_path, 'ab') if path else None
+        self.end = self._events.tell() if path else 0  # byte offset the next event is written at
+
+    def _skip(self, room_code):
+        return self._events is None or room_code.startswith('LOCAL_')
+
+    def _append(self, room_code, state, kind, color, roll=0, token=-1, flags=0):
+        if self._skip(room_code):
+            return
+        state.event_seq += 1
+        record = EVENT.pack(room_code.encode(), state.event_seq, kind, _color_code(color), roll, token, flags)
+        with self._lock:
+            self._events.write(record)
+            self._events.flush()
+            self.end += len(record)
+        # A MOVE is logged before end_move() clears the roll, so snapshot on
+        # the ROLL or PASS at or just after the boundary (a MOVE is never
+        # followed by another MOVE)
+        if kind != MOVE and state.event_seq % self.snapshot_every in (0, 1):
+            self.snapshot(room_code, state)
+
+    def roll(self, room_code, state):
+        self._append(room_code, state, ROLL, state.turn, state.rolled_value)
+
+    def move(self, room_code, state, token_idx, result):
+        self._append(room_code, state, MOVE, state.turn, state.rolled_value, token_idx, _flags(result))
+
+    def pass_turn(self, room_code, state):
+        """After next_turn(): records who has the dice now"""
+        self._append(room_code, state, PASS, state.turn)
+
+    def snapshot(self, room_code, state):
+        if self._skip(room_code):
+            return
+        record = pack_snapshot(room_code, state)
+        with self._lock:
+            self._snapshots.write(record)
+            self._snapshots.flush()
+
+    def events(self, room_code, start=0):
+        """(seq, kind, color, roll, token, result flags) for every logged event of a room, from byte offset start on"""
+        if self.path is None:
+            return
+        room = room_code.encode()
+        for rec_room, seq, kind, color, roll, token, flags in _records(self.path, EVENT, start):
+            if rec_room == room:
+                yield seq, kind, _color(color), roll, token, flags
+
+    def last_seq(self, room_code, start=0):
+        """Sequence number of a room's latest event logged at or after byte offset start, 0 if none"""
+        return max((seq for seq, *_ in self.events(room_code, start)), default=0)
+
+    def rebuild(self, room_code):
+        """The room as of its last logged event, or None if it was never logged"""
+        if self.path is None:
+            return None
+        room = room_code.encode()
+        latest = None
+        for record in _records(self.snapshot_path, SNAPSHOT):
+            if record[0] == room:
+                latest = record
+        if latest is None:
+            return None
+        state = state_from_snapshot(latest)
+        for seq, kind, color, roll, token, flags in self.events(room_code):
+            if seq <= state.event_seq:
+                continue
+            if seq != state.event_seq + 1:
+                raise ReplayError(f"event {state.event_seq + 1} missing before {seq}")
+            apply_event(state, kind, color, roll, token, flags)
+        return state
+
+    def close(self):
+        with self._lock:
+            for f in (self._events, self._snapshots):
+                if f:
+                    f.close()
+            self._events = self._snapshots = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a room from the Ludo event log")
+    parser.add_argument('path', help="event log file (EVENT_LOG)")
+    parser.add_argument('room_code')
+    args = parser.parse_args(argv)
+
+    log = EventLog(args.path)
+    room_code = args.room_code.upper()
+    for seq, kind, color, roll, token, flags in log.events(room_code):
+        detail = f"token {token} " + ' '.join(name for bit, name in ((CAPTURED, 'captured'), (WON, 'won'),
+                                                                     (EXTRA_TURN, 'extra turn')) if flags & bit) \
+            if kind == MOVE else (f"{roll}" if kind == ROLL else '')
+        print(f"{seq:>6} {KIND_NAMES.get(kind, kind):<5} {color or '-':<7} {detail}")
+    state = log.rebuild(room_code)
+    if state is None:
+        print(f"❌ No snapshot for room {room_code}")
+        return
+    print(f"🔁 Rebuilt {room_code} at event {state.event_seq}: {state.log}")
+    for color in state.active_colors:
+        print(f"  {color:<7} {list(state.tokens_of(color))}")
+
+
+if __name__ == '__main__':
+    main()
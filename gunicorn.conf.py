@@ -0,0 +1,22 @@
+"""Gunicorn settings; the worker class follows ASYNC_MODE so it always
+matches the backend app.py hands to Flask-SocketIO."""
+import os
+
+WORKER_CLASSES = {
+    'eventlet': 'eventlet',
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+    'threading': 'gthread',
+}
+
+worker_class = WORKER_CLASSES[os.environ.get('ASYNC_MODE', 'eventlet')]
+workers = 1  # rooms live in process memory; scale out with shards instead
+threads = int(os.environ.get('THREADS', '100'))  # gthread only
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+
+def worker_exit(server, worker):
+    """Write the rooms changed since the last room_db flush before the worker goes"""
+    import sys
+    app = sys.modules.get('app')
+    if app is not None:
+        app.room_db.close()
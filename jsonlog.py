@@ -0,0 +1,106 @@
+"""Structured JSON-lines logging, written off the request path.
+
+Handlers used to print() with emoji on every connect, join and game
+start, and Flask-SocketIO logged every packet the same way, all
+synchronously on the request path. setup() sends every log record through
+a queue instead. The caller only formats the message and enqueues the
+record. A listener task serializes each record as one JSON object per
+line and writes it:
+
+    {"ts": 1760000000.123, "level": "INFO", "logger": "ludo.rooms", "msg": "player joined", "room": "ABC123", "color": "red"}
+
+Fields passed with extra={...} become top-level keys. Levels are set per
+subsystem (logger name), e.g. "ludo=INFO,ludo.bots=DEBUG,engineio=WARNING".
+The Socket.IO and Engine.IO packet loggers are sampled: only a `sample`
+fraction of their records below WARNING is kept, and a kept record says
+so with "sampled".
+
+The listener is a threading.Thread, so like everything else it follows
+the async backend: a green thread under eventlet and gevent.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+PACKET_LOGGERS = ('socketio', 'engineio')
+
+_STANDARD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, extra fields, exc"""
+
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                 'msg': record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _STANDARD:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class Sample(logging.Filter):
+    """Keep a `rate` fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if random.random() >= self.rate:
+            return False
+        record.sampled = self.rate
+        return True
+
+
+class _Enqueue(logging.handlers.QueueHandler):
+    """QueueHandler that keeps structured fields and leaves formatting to the listener"""
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    """'ludo=INFO, engineio=WARNING' -> {'ludo': 'INFO', 'engineio': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup(level='INFO', levels='', sample=0.01, stream=None):
+    """Route all logging through a queue to a JSON-lines writer; returns the QueueListener"""
+    records = queue.Queue()
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JSONFormatter())
+    listener = logging.handlers.QueueListener(records, writer)
+
+    root = logging.getLogger()
+    root.handlers[:] = [_Enqueue(records)]
+    root.setLevel(level.upper())
+    for name in PACKET_LOGGERS:
+        packets = logging.getLogger(name)
+        packets.filters[:] = [Sample(sample)] if sample < 1 else []
+    for name, name_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(name_level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
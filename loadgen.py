@@ -0,0 +1,331 @@
+"""Socket.IO load generator: many online rooms playing at once.
+
+Every simulated room does what browsers do: POST /api/create-room, one
+client per seat connects and sends join_room_with_code, the host sends
+start_game, and each client rolls and moves on its turn for as long as
+the run lasts (finished games are restarted). Reported at the end:
+
+    - latency from roll_dice / move_token to the update_state showing it,
+      as percentiles and a log2 histogram
+    - connections that failed, dropped, or stopped receiving updates
+    - server memory (RSS) growth, when the server's pid is known
+
+Either point it at a running server (pass --pid to sample its memory) or
+let it start `python app.py` itself with --spawn <async mode>:
+
+    python loadgen.py --spawn eventlet --rooms 500 --duration 60
+    python loadgen.py http://127.0.0.1:5000 --pid 1234 --rooms 200 --players 4
+
+Needs python-socketio's client extras (`pip install "python-socketio[client]"`).
+Each client is a thread, so raise `ulimit -n` for thousands of rooms.
+"""
+import argparse
+from collections import Counter
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import socketio
+
+SEATS = {2: ['red', 'yellow'], 4: ['red', 'green', 'yellow', 'blue']}
+STALL_TIMEOUT = 30.0   # no update for this long counts the client as stalled
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port, **env):
+    """Start app.py with ASYNC_MODE=mode on port and wait for /health"""
+    env = dict(os.environ, ASYNC_MODE=mode, PORT=str(port), **env)
+    server = subprocess.Popen([sys.executable, 'app.py'], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not come up")
+
+
+def rss_bytes(pid):
+    """Resident memory of a process (Linux /proc), or None"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Stats:
+    """Counters and latencies shared by every simulated client"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {'roll': [], 'move': []}
+        self.counts = Counter()
+
+    def record(self, kind, seconds):
+        with self.lock:
+            self.latencies[kind].append(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+
+class Player:
+    """One browser seat: connects, joins a room and plays its turns"""
+
+    def __init__(self, url, room_code, color, stats):
+        self.url = url
+        self.room_code = room_code
+        self.color = color
+        self.stats = stats
+        self.state = {}
+        self.seq = -1
+        self.changed = threading.Event()
+        self.expect = None        # ('roll' | 'move', emitted at)
+        self.acted = None         # the (turn, roll, log) we acted on, until it changes
+        self.closing = False
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('update_state', self.on_update)
+        self.client.on('disconnect', self.on_disconnect)
+
+    def on_update(self, msg):
+        if msg['seq'] <= self.seq:
+            return  # the snapshot that repeats a delta we already have
+        self.seq = msg['seq']
+        patch = msg.get('full') or msg['patch']
+        tokens = patch.pop('tokens', None) if 'patch' in msg else None
+        self.state.update(patch)
+        if tokens:
+            self.state.setdefault('tokens', {}).update(tokens)
+
+        if self.expect:
+            kind, sent = self.expect
+            mine = self.state.get('turn') == self.color
+            if (kind == 'roll' and self.state.get('rolled_value') is not None) or \
+                    (kind == 'move' and not self.state.get('can_move')) or not mine:
+                self.stats.record(kind, time.perf_counter() - sent)
+                self.expect = None
+        self.changed.set()
+
+    def on_disconnect(self):
+        if not self.closing:
+            self.stats.count('dropped')
+        self.changed.set()
+
+    def connect(self):
+        try:
+            self.client.connect(self.url, transports=['websocket'], wait_timeout=10)
+            self.client.emit('join_room_with_code', {'room_code': self.room_code, 'color': self.color})
+            return True
+        except Exception:
+            self.stats.count('connect_failed')
+            return False
+
+    def start_game(self, num_players):
+        self.client.emit('start_game', {'mode': 'multiplayer', 'num_players': num_players,
+                                        'room_code': self.room_code})
+
+    def play(self, until, num_players, host):
+        """React to updates until the deadline; the host restarts finished games"""
+        while time.time() < until and self.client.connected:
+            wait = min(STALL_TIMEOUT, until - time.time())
+            if not self.changed.wait(max(wait, 0)):
+                if wait >= STALL_TIMEOUT:
+                    self.stats.count('stalled')
+                    return
+                continue
+            self.changed.clear()
+            state = self.state
+            log = state.get('log', '')
+            phase = (state.get('turn'), state.get('rolled_value'), log)
+            if phase == self.acted:
+                continue  # e.g. a player joined; we already acted on this
+            self.acted = None
+            if 'WINS' in log:
+                self.acted = phase
+                if host:
+                    self.stats.count('games_finished')
+                    self.start_game(num_players)
+                continue
+            if state.get('turn') != self.color or not state.get('game_started'):
+                continue
+            if state.get('rolled_value') is None and ('TO ROLL' in log or 'EXTRA TURN' in log):
+                self.acted = phase
+                self.expect = ('roll', time.perf_counter())
+                self.client.emit('roll_dice', {'room_code': self.room_code})
+            elif state.get('can_move'):
+                self.acted = phase
+                self.expect = ('move', time.perf_counter())
+                # any token will do; illegal picks are ignored by the server
+                for token in range(4):
+                    self.client.emit('move_token', {'room_code': self.room_code, 'token_index': token})
+
+    def close(self):
+        self.closing = True
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+
+def create_room(url, num_players):
+    request = urllib.request.Request(f"{url}/api/create-room", method='POST',
+                                     data=json.dumps({'mode': 'multiplayer', 'num_players': num_players}).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.load(response)
+    return data['room_code'], data.get('shard_url') or url
+
+
+def run_room(url, num_players, until, stats):
+    """Create a room, seat num_players clients and play until the deadline"""
+    try:
+        room_code, room_url = create_room(url, num_players)
+    except (OSError, ValueError, KeyError):
+        stats.count('create_failed')
+        return
+    players = [Player(room_url, room_code, color, stats) for color in SEATS[num_players]]
+    try:
+        if not all(player.connect() for player in players):
+            return
+        stats.count('connected', len(players))
+        # joins travel on separate sockets; start once the host sees every seat taken
+        deadline = time.time() + 10
+        while players[0].state.get('connected_players') != num_players and time.time() < deadline:
+            time.sleep(0.05)
+        players[0].start_game(num_players)
+        threads = [threading.Thread(target=player.play, args=(until, num_players, i == 0), daemon=True)
+                   for i, player in enumerate(players)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        for player in players:
+            player.close()
+
+
+def sample_memory(pid, stop, samples, interval=1.0):
+    while not stop.is_set():
+        rss = rss_bytes(pid)
+        if rss is not None:
+            samples.append(rss)
+        stop.wait(interval)
+
+
+def load(url, rooms, num_players=2, duration=60.0, ramp=10.0, pid=None):
+    """Run the load; returns (Stats, RSS samples in bytes, elapsed seconds)"""
+    stats = Stats()
+    samples = []
+    stop = threading.Event()
+    if pid:
+        samples.append(rss_bytes(pid))
+        threading.Thread(target=sample_memory, args=(pid, stop, samples), daemon=True).start()
+
+    started = time.time()
+    until = started + ramp + duration
+    threads = []
+    for i in range(rooms):
+        # spread room creation evenly over the ramp
+        time.sleep(max(0.0, started + ramp * i / rooms - time.time()))
+        t = threading.Thread(target=run_room, args=(url, num_players, until, stats), daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    stop.set()
+    if pid:
+        samples.append(rss_bytes(pid))
+    return stats, [s for s in samples if s is not None], time.time() - started
+
+
+def histogram(latencies, width=40):
+    """Log2 buckets in milliseconds as printable lines"""
+    buckets = Counter()
+    for seconds in latencies:
+        ms = seconds * 1000
+        bound = 1
+        while ms > bound:
+            bound *= 2
+        buckets[bound] += 1
+    if not buckets:
+        return []
+    top = max(buckets.values())
+    return [f"  ≤{bound:>6} ms {'█' * max(1, buckets[bound] * width // top):<{width}} {buckets[bound]}"
+            for bound in sorted(buckets)]
+
+
+def report(stats, samples, elapsed, rooms, num_players):
+    counts = stats.counts
+    print(f"🚀 {rooms} rooms × {num_players} players, {elapsed:.1f}s")
+    print(f"  connected {counts['connected']}/{rooms * num_players}, connect failed {counts['connect_failed']}, "
+          f"create failed {counts['create_failed']}, dropped {counts['dropped']}, stalled {counts['stalled']}, "
+          f"games finished {counts['games_finished']}")
+    print(f"  {'event':<6} {'n':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    everything = []
+    for kind, latencies in stats.latencies.items():
+        everything += latencies
+        if not latencies:
+            continue
+        ms = sorted(x * 1000 for x in latencies)
+        print(f"  {kind:<6} {len(ms):>7} {percentile(ms, 0.5):>8.1f} {percentile(ms, 0.9):>8.1f} "
+              f"{percentile(ms, 0.99):>8.1f} {ms[-1]:>8.1f}")
+    for line in histogram(everything):
+        print(line)
+    if len(samples) >= 2:
+        mb = 1024 * 1024
+        growth = samples[-1] - samples[0]
+        print(f"  server RSS {samples[0] / mb:.1f} MB -> {samples[-1] / mb:.1f} MB "
+              f"(peak {max(samples) / mb:.1f} MB, {growth / mb:+.1f} MB, {growth / max(rooms, 1) / 1024:+.1f} KB/room)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ludo Socket.IO load generator")
+    parser.add_argument('url', nargs='?', default=None, help="server base URL (omit with --spawn)")
+    parser.add_argument('--spawn', metavar='ASYNC_MODE', help="start app.py with this async mode")
+    parser.add_argument('--pid', type=int, help="server pid, to sample its memory")
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, choices=(2, 4), default=2)
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of play after the ramp")
+    parser.add_argument('--ramp', type=float, default=10.0, help="seconds over which rooms are created")
+    args = parser.parse_args(argv)
+    if not args.url and not args.spawn:
+        parser.error("give a server URL or --spawn")
+
+    server = None
+    url, pid = args.url, args.pid
+    if args.spawn:
+        port = free_port()
+        server = start_server(args.spawn, port, MAX_ROOMS=str(max(args.rooms * 2, 50000)))
+        url, pid = f"http://127.0.0.1:{port}", server.pid
+    try:
+        stats, samples, elapsed = load(url.rstrip('/'), args.rooms, args.players, args.duration, args.ramp, pid)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    report(stats, samples, elapsed, args.rooms, args.players)
+
+
+if __name__ == '__main__':
+    main()
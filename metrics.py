@@ -0,0 +1,143 @@
+"""In-process counters, gauges and histograms served as /metrics.
+
+Recording is a dict lookup and an add under a per-metric lock, cheap
+enough for every socket event; the Prometheus text format is only built
+when /metrics is scraped. Gauges can also be given a collect() function
+that computes their values at scrape time (rooms by mode, pool depth),
+so nothing has to be kept in sync on the request path.
+
+    ROLLS = Counter('ludo_rolls_total', "Dice rolled", ('mode',))
+    ROLLS.inc('computer')
+    LATENCY = Histogram('ludo_handler_seconds', "Handler time", ('event',))
+    LATENCY.observe(0.004, 'roll_dice')
+"""
+from bisect import bisect_left
+import functools
+import threading
+import time
+
+# seconds; the +Inf bucket is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+registry = []
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def samples(self):
+        """(suffix, label text, value) for every series"""
+        with self._lock:
+            items = list(self._values.items())
+        return [('', _labels(self.label_names, labels), value) for labels, value in sorted(items)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {_number(value)}" for suffix, labels, value in self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down, or is computed by collect() when scraped"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), collect=None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self):
+        if self.collect is None:
+            return super().samples()
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [('', _labels(self.label_names, labels if isinstance(labels, tuple) else (labels,)), value)
+                for labels, value in sorted(values.items(), key=lambda item: str(item[0]))]
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # per-bucket counts (last is +Inf), then sum
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        """Decorator: observe how long each call takes"""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *labels)
+            return timed
+        return wrap
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        out = []
+        for labels, series in sorted(items):
+            total = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                total += count
+                le = f'le="{bound}"'
+                out.append(('_bucket', _labels(self.label_names, labels, le), total))
+            out.append(('_sum', _labels(self.label_names, labels), series[-1]))
+            out.append(('_count', _labels(self.label_names, labels), total))
+        return out
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    return '\n'.join(metric.render() for metric in registry) + '\n'
@@ -0,0 +1,102 @@
+"""On-demand sampling profiler for a live server process.
+
+Nothing runs until start() is called (the app exposes it as the admin
+endpoint POST /admin/profile). For the requested number of seconds a
+native OS thread wakes every `interval` and records the stack of every
+other thread via sys._current_frames(), then writes the counts as
+collapsed stacks, one `frame;frame;frame count` line per distinct stack,
+ready for flamegraph.pl or speedscope.
+
+Each stack is prefixed with tags naming what the thread was doing, found
+by walking the stack rather than by bookkeeping on the request path: the
+app's tag(frame) callback recognizes frames such as a Socket.IO handler
+call or a room mailbox event and returns (event, room_code), and the
+room's game mode comes from mode_of(room_code):
+
+    event:roll_dice;mode:computer;app.py:handle_roll;...;engine.py:roll_dice 12
+
+The sampler is a real OS thread even under eventlet or gevent, so it
+interrupts a green thread that hogs the CPU instead of waiting its turn;
+there, all green threads share one OS thread and each sample shows the
+one that was running.
+"""
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+
+def native(module, name):
+    """module.name as it was before eventlet/gevent monkey patching"""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        return getattr(patcher.original(module), name)
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        return monkey.get_original(module, name)
+    return getattr(__import__(module), name)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack for a while, then writes collapsed stacks"""
+
+    def __init__(self, interval=0.005, tag=None, mode_of=None, max_depth=128):
+        self.interval = interval
+        self.tag = tag
+        self.mode_of = mode_of
+        self.max_depth = max_depth
+        self.running = False
+        self.last = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds, path):
+        """Profile for seconds in the background, writing to path; False if already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+        native('_thread', 'start_new_thread')(self._run, (seconds, path))
+        return True
+
+    def status(self):
+        return {'running': self.running, 'interval': self.interval, 'last': self.last}
+
+    def _run(self, seconds, path):
+        sleep = native('time', 'sleep')
+        me = native('_thread', 'get_ident')()
+        stacks = Counter()
+        ticks = 0
+        started = time.monotonic()
+        try:
+            while time.monotonic() - started < seconds:
+                for ident, frame in sys._current_frames().items():
+                    if ident != me:
+                        stacks[self._collapse(frame)] += 1
+                ticks += 1
+                sleep(self.interval)
+            with open(path, 'w') as out:
+                for stack, count in stacks.most_common():
+                    out.write(f"{stack} {count}\n")
+            self.last = {'path': path, 'seconds': round(time.monotonic() - started, 3), 'ticks': ticks,
+                         'samples': sum(stacks.values()), 'stacks': len(stacks)}
+        except Exception as exc:
+            self.last = {'path': path, 'error': repr(exc)}
+        finally:
+            self.running = False
+
+    def _collapse(self, frame):
+        names = []
+        event = room_code = None
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            found = self.tag(frame) if self.tag else None
+            if found:
+                # the outermost event names the stack; any room on it gives the mode
+                event = found[0] or event
+                room_code = room_code or found[1]
+            frame = frame.f_back
+        names.reverse()
+        mode = self.mode_of(room_code) if self.mode_of and room_code else None
+        return ';'.join([f"event:{event or '-'}", f"mode:{mode or '-'}"] + names)
@@ -0,0 +1,69 @@
+"""Per-room mailboxes: each room handles its events one at a time.
+
+Socket handlers, scheduler timers and the broadcast flusher all change
+rooms, and under the threading backend they do it from different threads
+at once; checks like `rolled_value is None` then race. Instead every
+change to a room is posted to that room's mailbox as fn(*args), and the
+mailbox runs them strictly in order.
+
+There are no worker threads: whoever posts to an idle room runs the event
+right away and keeps draining anything that queued up behind it, so a
+room is busy on at most one thread and different rooms run in parallel.
+Posting to a busy room only appends and returns, so nothing ever waits on
+another room's lock, and the per-room queue depth can be measured.
+
+Events run outside any request context: they take the sid they act for
+as an argument instead of reading `request`.
+"""
+from collections import deque
+import logging
+import threading
+
+log = logging.getLogger('ludo.rooms')
+
+
+class Mailboxes:
+    """room_code -> FIFO of pending (fn, args), present while the room is busy"""
+
+    def __init__(self):
+        self._boxes = {}
+        self._lock = threading.Lock()
+        self.stats = {'posted': 0, 'queued': 0, 'run': 0, 'failed': 0, 'max_depth': 0}
+
+    def post(self, key, fn, *args):
+        """Run fn(*args) in key's order; returns False if it was queued behind another event"""
+        with self._lock:
+            self.stats['posted'] += 1
+            box = self._boxes.get(key)
+            if box is not None:
+                box.append((fn, args))
+                self.stats['queued'] += 1
+                self.stats['max_depth'] = max(self.stats['max_depth'], len(box))
+                return False
+            box = self._boxes[key] = deque()
+        self._drain(key, box, fn, args)
+        return True
+
+    def _drain(self, key, box, fn, args):
+        while True:
+            try:
+                fn(*args)
+            except Exception:
+                log.exception("room event failed")
+                with self._lock:
+                    self.stats['failed'] += 1
+            with self._lock:
+                self.stats['run'] += 1
+                if not box:
+                    del self._boxes[key]
+                    return
+                fn, args = box.popleft()
+
+    def depth(self, key):
+        """Events waiting behind the one running for key"""
+        box = self._boxes.get(key)
+        return len(box) if box is not None else 0
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, busy=len(self._boxes), waiting=sum(len(box) for box in self._boxes.values()))
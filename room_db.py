@@ -0,0 +1,145 @@
+"""Write-behind SQLite persistence for online rooms.
+
+Rooms live in memory; this keeps a copy on disk so a deploy or crash
+doesn't wipe the games in progress. Nothing touches SQLite on the request
+path: mark() packs the room, from inside its mailbox so the snapshot is
+never torn, and a background writer calls flush() every few seconds to
+write every dirty room in one transaction (WAL mode, so readers never wait
+on it). A room is stored as the same 48-byte snapshot record the event log
+uses, and deleted once its game has a winner.
+
+SQLite calls block, so they go through offload(fn, *args), which the app
+points at a real OS thread under eventlet and gevent; `lock` guards the
+connection and must be a lock that works from such a thread.
+
+Nothing is read at startup. load() fetches a single room the first time
+a player asks for it, so startup time doesn't grow with the backlog.
+Each row also keeps the event log's end offset when the room was packed,
+so a restore only has to read the log from there on.
+Rows not written for longer than ttl seconds are pruned on open and then
+by flush() every prune_every seconds; forget() drops a room's row, e.g.
+once it has been evicted for idleness.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+import engine
+from event_log import SNAPSHOT, pack_snapshot, state_from_snapshot
+
+log = logging.getLogger('ludo.rooms')
+
+
+class RoomDB:
+    """Dirty-room buffer in front of a SQLite table; a None path disables it"""
+
+    def __init__(self, path=None, ttl=86400.0, clock=time.time, offload=None, lock=None, prune_every=3600.0):
+        self.path = path
+        self.clock = clock
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._pruned = clock()
+        self._offload = offload or (lambda fn, *args: fn(*args))
+        self._dirty = {}  # room_code -> (packed snapshot, event log offset), or None to delete
+        self._lock = threading.Lock()
+        self._conn_lock = lock or threading.Lock()
+        self._conn = None
+        self.stats = {'flushes': 0, 'written': 0, 'deleted': 0, 'pruned': 0, 'loaded': 0}
+        if path:
+            self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS rooms (room_code TEXT PRIMARY KEY, state BLOB NOT NULL, '
+                               'updated REAL NOT NULL, log_offset INTEGER NOT NULL DEFAULT 0)')
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(rooms)')]
+            if 'log_offset' not in columns:
+                self._conn.execute('ALTER TABLE rooms ADD COLUMN log_offset INTEGER NOT NULL DEFAULT 0')
+            self._conn.execute('DELETE FROM rooms WHERE updated < ?', (clock() - ttl,))
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def mark(self, room_code, state, log_offset=0):
+        """Pack a room for the next flush; call it from the room's mailbox (LOCAL_ rooms aren't kept)
+
+        log_offset is the event log's end at this point: every later event
+        of the room is logged after it.
+        """
+        if self._conn is None or room_code.startswith('LOCAL_'):
+            return
+        try:
+            record = None if engine.winner(state) else (pack_snapshot(room_code, state), log_offset)
+        except Exception:
+            log.exception("room not saved", extra={'room': room_code})
+            return
+        with self._lock:
+            self._dirty[room_code] = record
+
+    def forget(self, room_code):
+        """Delete a room's row at the next flush"""
+        if self._conn is not None and not room_code.startswith('LOCAL_'):
+            with self._lock:
+                self._dirty[room_code] = None
+
+    def flush(self):
+        """Write every dirty room in one transaction, pruning old rows when due; returns how many"""
+        now = self.clock()
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        prune = now - self._pruned >= self.prune_every
+        if not dirty and not prune:
+            return 0
+        rows = [(code, record[0], now, record[1]) for code, record in dirty.items() if record is not None]
+        finished = [(code,) for code, record in dirty.items() if record is None]
+        try:
+            pruned = self._offload(self._write, rows, finished, now - self.ttl if prune else None)
+        except sqlite3.Error:
+            # keep them for the next flush unless they changed again since
+            with self._lock:
+                for code, record in dirty.items():
+                    self._dirty.setdefault(code, record)
+            raise
+        self.stats['flushes'] += 1
+        self.stats['written'] += len(rows)
+        self.stats['deleted'] += len(finished)
+        if prune:
+            self._pruned = now
+            self.stats['pruned'] += pruned
+        return len(dirty)
+
+    def _write(self, rows, finished, cutoff=None):
+        """Upsert rows, delete finished and, given a cutoff, rows older than it; returns how many were pruned"""
+        with self._conn_lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO rooms (room_code, state, updated, log_offset) VALUES (?, ?, ?, ?)', rows)
+                self._conn.executemany('DELETE FROM rooms WHERE room_code = ?', finished)
+                pruned = self._conn.execute('DELETE FROM rooms WHERE updated < ?', (cutoff,)).rowcount if cutoff else 0
+                self._conn.execute('COMMIT')
+            except sqlite3.Error:
+                self._conn.execute('ROLLBACK')
+                raise
+        return pruned
+
+    def load(self, room_code):
+        """(stored room, event log offset), or None; players have to rejoin their seats"""
+        if self._conn is None:
+            return None
+        row = self._offload(self._select, room_code)
+        if row is None:
+            return None
+        self.stats['loaded'] += 1
+        return state_from_snapshot(SNAPSHOT.unpack(row[0])), row[1]
+
+    def _select(self, room_code):
+        with self._conn_lock:
+            return self._conn.execute('SELECT state, log_offset FROM rooms WHERE room_code = ?', (room_code,)).fetchone()
+
+    def close(self):
+        """Flush what is left, on this thread (e.g. at exit), and close"""
+        if self._conn is not None:
+            self._offload = lambda fn, *args: fn(*args)
+            self.flush()
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,106 @@
+"""Bounded in-memory room storage.
+
+Rooms used to live in a plain dict that nothing ever removed from. RoomStore
+keeps them in least-recently-active order, drops rooms that have been idle
+longer than the TTL, and evicts the least recently active room when the
+store is full. Every removal is counted and reported to an on_evict
+callback so the app can clean up sessions and Socket.IO rooms.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class RoomStore:
+    """Dict-like room_code -> GameState map with idle TTL and LRU eviction
+
+    Reading a room through [] or get() counts as activity; peek() and
+    `in` do not.
+    """
+
+    def __init__(self, max_rooms=50000, ttl=1800.0, on_evict=None, clock=time.monotonic):
+        self.max_rooms = max_rooms
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.clock = clock
+        self._rooms = OrderedDict()   # least recently active first
+        self._last_active = {}
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'evicted_idle': 0, 'evicted_full': 0, 'closed': 0}
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __contains__(self, room_code):
+        return room_code in self._rooms
+
+    def __getitem__(self, room_code):
+        with self._lock:
+            state = self._rooms[room_code]
+            self._touch(room_code)
+        return state
+
+    def get(self, room_code, default=None):
+        try:
+            return self[room_code]
+        except KeyError:
+            return default
+
+    def peek(self, room_code, default=None):
+        return self._rooms.get(room_code, default)
+
+    def states(self):
+        """A snapshot list of every stored room, without touching them"""
+        with self._lock:
+            return list(self._rooms.values())
+
+    def __setitem__(self, room_code, state):
+        evicted = []
+        with self._lock:
+            if room_code not in self._rooms:
+                self.stats['created'] += 1
+            self._rooms[room_code] = state
+            self._touch(room_code)
+            while len(self._rooms) > self.max_rooms:
+                evicted.append(self._remove(next(iter(self._rooms)), 'evicted_full'))
+        self._notify(evicted)
+
+    def pop(self, room_code, reason='closed'):
+        """Remove a room on purpose, e.g. its only player left"""
+        with self._lock:
+            if room_code not in self._rooms:
+                return None
+            evicted = [self._remove(room_code, reason)]
+        self._notify(evicted)
+        return evicted[0][1]
+
+    def idle_for(self, room_code):
+        """Seconds since the room was last active"""
+        return self.clock() - self._last_active[room_code]
+
+    def sweep(self):
+        """Evict every room idle for longer than the TTL; returns how many"""
+        evicted = []
+        deadline = self.clock() - self.ttl
+        with self._lock:
+            for room_code in self._rooms:
+                if self._last_active[room_code] > deadline:
+                    break  # everything after this was active more recently
+                evicted.append(room_code)
+            evicted = [self._remove(room_code, 'evicted_idle') for room_code in evicted]
+        self._notify(evicted)
+        return len(evicted)
+
+    def _touch(self, room_code):
+        self._rooms.move_to_end(room_code)
+        self._last_active[room_code] = self.clock()
+
+    def _remove(self, room_code, reason):
+        self.stats[reason] += 1
+        del self._last_active[room_code]
+        return room_code, self._rooms.pop(room_code), reason
+
+    def _notify(self, evicted):
+        if self.on_evict:
+            for room_code, state, reason in evicted:
+                self.on_evict(room_code, state, reason)
@@ -0,0 +1,118 @@
+"""Single-task timer scheduler for game pacing.
+
+Bot rolls, bot moves and turn hand-overs used to each start a background
+task that slept for a second or two, and some socket handlers slept
+inline. Now every delayed action is a (due time, callback) entry in one
+heap, driven by one background task, and handlers return immediately.
+
+A timer can carry a key (the room code): scheduling a new keyed timer
+replaces the pending one, since a room only ever waits on one thing.
+With a dispatch function, a due keyed timer is handed to dispatch(key,
+run, timer) instead of running on the scheduler task (the app passes its
+per-room mailbox post). It counts as pending, and can still be cancelled
+or replaced, until it actually runs.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger('ludo.scheduler')
+
+
+class Timer:
+    __slots__ = ('due', 'fn', 'args', 'key', 'cancelled')
+
+    def __init__(self, due, fn, args, key):
+        self.due = due
+        self.fn = fn
+        self.args = args
+        self.key = key
+        self.cancelled = False
+
+
+class Scheduler:
+    """Run callbacks at their due time from one background task
+
+    start_task and sleep are the async backend's primitives (e.g.
+    socketio.start_background_task and socketio.sleep); the driver task is
+    started on the first call_later().
+    """
+
+    def __init__(self, start_task, sleep, resolution=0.05, clock=time.monotonic, dispatch=None):
+        self.start_task = start_task
+        self.sleep = sleep
+        self.dispatch = dispatch
+        self.resolution = resolution
+        self.clock = clock
+        self._heap = []
+        self._keyed = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def call_later(self, delay, fn, *args, key=None):
+        """Run fn(*args) after delay seconds, replacing any timer with the same key"""
+        timer = Timer(self.clock() + delay, fn, args, key)
+        with self._lock:
+            if key is not None:
+                previous = self._keyed.get(key)
+                if previous:
+                    previous.cancelled = True
+                self._keyed[key] = timer
+            heapq.heappush(self._heap, (timer.due, next(self._order), timer))
+            start = not self._started
+            self._started = True
+        if start:
+            self.start_task(self._run)
+        return timer
+
+    def cancel(self, key):
+        """Drop the pending timer for key, if any"""
+        with self._lock:
+            timer = self._keyed.pop(key, None)
+        if timer:
+            timer.cancelled = True
+
+    def pending(self, key):
+        """Whether a timer is waiting for key"""
+        return key in self._keyed
+
+    def __len__(self):
+        return len(self._heap)
+
+    def run_due(self):
+        """Run (or dispatch) every timer that is due now; returns how many"""
+        now = self.clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                timer = heapq.heappop(self._heap)[2]
+                if not timer.cancelled:
+                    due.append(timer)
+        for timer in due:
+            if self.dispatch is not None and timer.key is not None:
+                self.dispatch(timer.key, self.run, timer)
+            else:
+                self.run(timer)
+        return len(due)
+
+    def run(self, timer):
+        """Run one due timer unless it was cancelled or replaced meanwhile"""
+        with self._lock:
+            if timer.cancelled:
+                return
+            if timer.key is not None and self._keyed.get(timer.key) is timer:
+                del self._keyed[timer.key]
+        try:
+            timer.fn(*timer.args)
+        except Exception:
+            log.exception("timer failed")
+
+    def _run(self):
+        while True:
+            self.run_due()
+            with self._lock:
+                wait = self._heap[0][0] - self.clock() if self._heap else self.resolution
+            self.sleep(min(max(wait, 0), self.resolution))
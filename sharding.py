@@ -0,0 +1,101 @@
+"""Room sharding across worker processes.
+
+Each worker process owns one shard of the room code space. A room code
+hashes to exactly one shard, so any worker can tell where a room lives
+without a shared directory: /api/create-room only hands out codes owned by
+the worker that served it, and /api/join-room points the browser at the
+owning shard, which it then connects its socket to (sticky by room code).
+
+Broadcasts go through Flask-SocketIO's message_queue so any process can
+emit to any room. Configuration, all optional (defaults = one shard):
+
+    SHARD_COUNT    number of shards
+    SHARD_ID       this worker's shard, 0 .. SHARD_COUNT-1
+    SHARD_URLS     comma-separated public base URL of every shard, in order
+    MESSAGE_QUEUE  redis://..., amqp://..., or local:// for the in-process
+                   stand-in below
+"""
+import json
+import os
+import queue
+import threading
+import urllib.request
+import zlib
+
+import socketio
+
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', '1'))
+SHARD_ID = int(os.environ.get('SHARD_ID', '0'))
+SHARD_URLS = [url.strip().rstrip('/') for url in os.environ.get('SHARD_URLS', '').split(',') if url.strip()]
+MESSAGE_QUEUE = os.environ.get('MESSAGE_QUEUE')
+
+
+def shard_for(room_code, count=None):
+    """Shard owning a room code; stable across processes unlike hash()"""
+    return zlib.crc32(room_code.encode()) % (count or SHARD_COUNT)
+
+
+def is_local(room_code):
+    """Whether this worker owns the room (LOCAL_ rooms live with their socket)"""
+    return room_code.startswith('LOCAL_') or shard_for(room_code) == SHARD_ID
+
+
+def shard_url(shard=SHARD_ID):
+    """Public base URL of a shard, '' meaning the page's own origin"""
+    return SHARD_URLS[shard] if shard < len(SHARD_URLS) else ''
+
+
+def owner_url(room_code):
+    return shard_url(shard_for(room_code))
+
+
+def queue_options():
+    """Extra SocketIO() arguments for the configured message queue"""
+    if not MESSAGE_QUEUE:
+        return {}
+    if MESSAGE_QUEUE.startswith('local://'):
+        return {'client_manager': LocalQueueManager(channel=MESSAGE_QUEUE[len('local://'):] or 'flask-socketio')}
+    return {'message_queue': MESSAGE_QUEUE}
+
+
+def cluster_health(timeout=1.0):
+    """Ask every other shard's /health for its room count"""
+    shards = []
+    for shard in range(SHARD_COUNT):
+        if shard == SHARD_ID or not shard_url(shard):
+            continue
+        try:
+            with urllib.request.urlopen(f"{shard_url(shard)}/health", timeout=timeout) as response:
+                shards.append(json.load(response))
+        except (OSError, ValueError):
+            shards.append({'status': 'unreachable', 'shard': shard})
+    return shards
+
+
+class LocalQueueManager(socketio.PubSubManager):
+    """In-process stand-in for a Redis/AMQP message queue
+
+    Every manager created on the same channel receives what the others
+    publish, so several SocketIO servers in one process (tests, local
+    development) behave like separate workers sharing a real queue.
+    """
+    name = 'local'
+
+    _channels = {}
+    _lock = threading.Lock()
+
+    def __init__(self, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.inbox = queue.Queue()
+        with self._lock:
+            self._channels.setdefault(channel, []).append(self.inbox)
+
+    def _publish(self, data):
+        with self._lock:
+            inboxes = list(self._channels.get(self.channel, ()))
+        for inbox in inboxes:
+            inbox.put(data)
+
+    def _listen(self):
+        while True:
+            yield self.inbox.get()
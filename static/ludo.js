@@ -0,0 +1,485 @@
+const SOCKET_OPTIONS = {
+    transports: ['websocket', 'polling'],
+    upgrade: true,
+    rememberUpgrade: true,
+    timeout: 10000,
+    reconnection: true,
+    reconnectionDelay: 1000,
+    reconnectionAttempts: 5
+};
+
+// ?wire=bin asks for the compact binary updates (see wire.py); the server
+// confirms with wire_hello, otherwise everything stays JSON
+if(new URLSearchParams(location.search).get('wire') === 'bin') {
+    SOCKET_OPTIONS.auth = {wire: 'bin'};
+}
+let wire = null;
+
+// Online rooms live on one shard; the socket moves to the server that owns the room
+const socketHandlers = [];
+let socket = null;
+let socketUrl = null;
+
+function onSocket(event, handler) {
+    socketHandlers.push([event, handler]);
+    if(socket) socket.on(event, handler);
+}
+
+function connectSocket(url) {
+    if(socket && url === socketUrl) return;
+    if(socket) socket.disconnect();
+    socketUrl = url;
+    socket = url ? io(url, SOCKET_OPTIONS) : io(SOCKET_OPTIONS);
+    socketHandlers.forEach(([event, handler]) => socket.on(event, handler));
+}
+
+connectSocket('');
+
+let gameMode = null;
+let selectedColor = null;
+let currentRoomCode = null;
+let isOnlineMode = false;
+
+const connStatus = document.getElementById('connStatus');
+
+onSocket('connect', () => {
+    console.log('✅ Connected to server');
+    connStatus.textContent = '✅ Connected';
+    connStatus.className = 'connection-status connected';
+});
+
+onSocket('disconnect', () => {
+    console.log('❌ Disconnected from server');
+    connStatus.textContent = '❌ Disconnected';
+    connStatus.className = 'connection-status disconnected';
+});
+
+onSocket('connect_error', (error) => {
+    console.error('Connection error:', error);
+    connStatus.textContent = '⚠️ Connection Error';
+    connStatus.className = 'connection-status disconnected';
+});
+
+onSocket('error', (data) => {
+    alert(data.message);
+});
+
+onSocket('watching', (data) => {
+    console.log('👀 Watching:', data);
+});
+
+onSocket('wire_hello', (hello) => {
+    console.log('📦 Binary updates on');
+    wire = hello;
+});
+
+onSocket('room_joined', (data) => {
+    console.log('✅ Joined room:', data);
+    currentRoomCode = data.room_code;
+});
+
+onSocket('room_assigned', (data) => {
+    console.log('📍 Room assigned:', data.room_code);
+    currentRoomCode = data.room_code;
+});
+
+const pathCoords = [[7,2],[7,3],[7,4],[7,5],[7,6],[6,7],[5,7],[4,7],[3,7],[2,7],[1,7],[1,8],[1,9],[2,9],[3,9],[4,9],[5,9],[6,9],[7,10],[7,11],[7,12],[7,13],[7,14],[7,15],[8,15],[9,15],[9,14],[9,13],[9,12],[9,11],[9,10],[10,9],[11,9],[12,9],[13,9],[14,9],[15,9],[15,8],[15,7],[14,7],[13,7],[12,7],[11,7],[10,7],[9,6],[9,5],[9,4],[9,3],[9,2],[9,1],[8,1],[7,1]];
+const homePaths = {
+    red:[[8,2],[8,3],[8,4],[8,5],[8,6],[8,7]],
+    green:[[2,8],[3,8],[4,8],[5,8],[6,8],[7,8]],
+    yellow:[[8,14],[8,13],[8,12],[8,11],[8,10],[8,9]],
+    blue:[[14,8],[13,8],[12,8],[11,8],[10,8],[9,8]]
+};
+const safeCoords = ["7-2","2-7","6-9","9-14","14-9","9-2","7-14","2-9"];
+
+// Initialize board
+for(let r=1;r<=15;r++) {
+    for(let c=1;c<=15;c++) {
+        if(!((r<=6&&c<=6)||(r<=6&&c>=10)||(r>=10&&c<=6)||(r>=10&&c>=10)||(r>=7&&r<=9&&c>=7&&c<=9))) {
+            let cell=document.createElement('div');
+            cell.className='cell';
+            cell.id=`cell-${r}-${c}`;
+            if(safeCoords.includes(`${r}-${c}`)) cell.classList.add('safe-zone');
+            cell.style.gridRow=r;
+            cell.style.gridColumn=c;
+            document.getElementById('board').appendChild(cell);
+        }
+    }
+}
+
+function backToMenu() {
+    document.getElementById('room-menu').style.display='none';
+    document.getElementById('main-menu').style.display='block';
+}
+
+function showOnlineMenu() {
+    document.getElementById('main-menu').style.display='none';
+    document.getElementById('room-menu').style.display='block';
+    isOnlineMode = true;
+}
+
+async function createOnlineRoom() {
+    const response = await fetch('/api/create-room', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({mode: 'multiplayer', num_players: 4})
+    });
+
+    const data = await response.json();
+    if(data.success) {
+        connectSocket(data.shard_url);
+        currentRoomCode = data.room_code;
+        gameMode = 'multiplayer';
+
+        document.getElementById('room-menu').style.display='none';
+        document.getElementById('color-select').style.display='block';
+        document.getElementById('room-code-container').style.display='block';
+        document.getElementById('room-code-display').innerText = data.room_code;
+
+        console.log('✅ Room created:', data.room_code);
+    }
+}
+
+// Find the shard that owns a room; the room's info from there, or null
+async function lookupRoom() {
+    const code = document.getElementById('join-code-input').value.toUpperCase().trim();
+    if(!code) {
+        alert('Please enter a room code!');
+        return null;
+    }
+
+    let response = await fetch(`/api/join-room/${code}`);
+    let data = await response.json();
+    if(data.redirect) {
+        response = await fetch(`${data.shard_url}/api/join-room/${code}`);
+        data = await response.json();
+    }
+
+    if(data.success && data.exists) {
+        connectSocket(data.shard_url);
+        currentRoomCode = code;
+        return data;
+    }
+    alert('Room not found! Please check the code.');
+    return null;
+}
+
+async function joinOnlineRoom() {
+    const data = await lookupRoom();
+    if(!data) return;
+    gameMode = 'multiplayer';
+
+    document.getElementById('room-menu').style.display='none';
+    document.getElementById('color-select').style.display='block';
+
+    document.querySelectorAll('.color-option').forEach(option => {
+        const color = option.getAttribute('data-color');
+        if(!data.available_colors.includes(color)) {
+            option.classList.add('disabled');
+            option.style.pointerEvents = 'none';
+        }
+    });
+
+    console.log('✅ Joining room:', currentRoomCode);
+}
+
+async function watchOnlineRoom() {
+    const data = await lookupRoom();
+    if(!data) return;
+    gameMode = 'spectator';
+
+    document.getElementById('room-menu').style.display='none';
+    document.getElementById('game-container').style.display='block';
+    socket.emit('watch_room', {room_code: currentRoomCode});
+
+    console.log('👀 Watching room:', currentRoomCode);
+}
+
+function copyRoomCode() {
+    const code = document.getElementById('room-code-display').innerText;
+    navigator.clipboard.writeText(code);
+    alert('Room code copied: ' + code);
+}
+
+document.querySelectorAll('.color-option').forEach(option => {
+    option.addEventListener('click', function() {
+        if(this.classList.contains('disabled')) return;
+
+        document.querySelectorAll('.color-option').forEach(el => el.classList.remove('selected'));
+        this.classList.add('selected');
+        selectedColor = this.getAttribute('data-color');
+        console.log('🎨 Selected color:', selectedColor);
+
+        setTimeout(() => {
+            if(isOnlineMode && currentRoomCode) {
+                socket.emit('join_room_with_code', {
+                    room_code: currentRoomCode,
+                    color: selectedColor
+                });
+
+                document.getElementById('color-select').style.display='none';
+                document.getElementById('game-container').style.display='block';
+
+                socket.emit('start_game', {
+                    mode: 'multiplayer',
+                    num_players: 4,
+                    room_code: currentRoomCode
+                });
+            } else {
+                document.getElementById('color-select').style.display='none';
+                document.getElementById('player-select').style.display='block';
+                document.getElementById('difficulty-select').style.display = gameMode === 'computer' ? 'block' : 'none';
+            }
+        }, 500);
+    });
+});
+
+function startComputer() {
+    console.log('🤖 Starting VS COMPUTER mode');
+    gameMode = 'computer';
+    isOnlineMode = false;
+    document.getElementById('main-menu').style.display='none';
+    document.getElementById('color-select').style.display='block';
+}
+
+function startMultiplayer() {
+    console.log('👥 Starting LOCAL MULTIPLAYER mode');
+    gameMode = 'multiplayer';
+    isOnlineMode = false;
+    document.getElementById('main-menu').style.display='none';
+    document.getElementById('player-select').style.display='block';
+    document.getElementById('difficulty-select').style.display='none';
+}
+
+function confirmGame(players) {
+    console.log('✅ Starting game:', {mode: gameMode, players, color: selectedColor, room: currentRoomCode});
+    document.getElementById('player-select').style.display='none';
+    document.getElementById('game-container').style.display='block';
+
+    socket.emit('start_game', {
+        mode: gameMode,
+        num_players: players,
+        user_color: gameMode === 'computer' ? selectedColor : null,
+        difficulty: gameMode === 'computer' ? document.getElementById('difficulty-input').value : null,
+        room_code: currentRoomCode
+    });
+}
+
+// Binary sessions send actions as two bytes: op (1 roll, 2 move, 3 resync) and token
+function sendAction(op, token, event, data) {
+    if(wire) socket.emit('act', new Uint8Array([op, token]));
+    else socket.emit(event, data);
+}
+
+function rollDice() {
+    if(gameMode === 'spectator') return;
+    sendAction(1, 0, 'roll_dice', {room_code: currentRoomCode});
+}
+
+function moveToken(idx) {
+    if(gameMode === 'spectator') return;
+    sendAction(2, idx, 'move_token', {token_index: idx, room_code: currentRoomCode});
+}
+
+function requestState() {
+    sendAction(3, 0, 'request_state', {room_code: currentRoomCode});
+}
+
+document.querySelectorAll('.status-box').forEach(box => {
+    box.addEventListener('click', function() {
+        console.log('🎲 DICE BOX CLICKED! Room:', currentRoomCode);
+        rollDice();
+    });
+});
+
+document.querySelectorAll('.dice-slot').forEach(dice => {
+    dice.addEventListener('click', function(e) {
+        e.stopPropagation();
+        console.log('🎲 DICE SLOT CLICKED! Room:', currentRoomCode);
+        rollDice();
+    });
+});
+
+// update_state carries either a full snapshot or a patch of changed
+// fields; patches must arrive in sequence or we ask for a snapshot
+let gameState = null;
+let stateSeq = 0;
+let resyncing = false;
+
+function applyUpdate(msg) {
+    if(msg.full) {
+        gameState = msg.full;
+        resyncing = false;
+    } else {
+        if(!gameState || resyncing) return;
+        if(msg.seq !== stateSeq + 1) {
+            console.log('🔄 Missed update, resyncing:', stateSeq, msg.seq);
+            resyncing = true;
+            requestState();
+            return;
+        }
+        const {tokens, ...fields} = msg.patch;
+        Object.assign(gameState, fields);
+        if(tokens) {
+            Object.entries(tokens).forEach(([color, list]) => {
+                gameState.players[color].tokens = list;
+            });
+        }
+    }
+    stateSeq = msg.seq;
+    renderState(gameState);
+    if(msg.events) showEvents(msg.events);
+}
+
+onSocket('update_state', applyUpdate);
+onSocket('update_bin', (data) => applyUpdate(decodeUpdate(new Uint8Array(data))));
+
+// Mirror of wire.decode_update(): kind, uint32 seq, then (field id, value)
+// pairs; log lines are a template id plus arguments, 0 for raw UTF-8
+function decodeLog(bytes, at) {
+    const id = bytes[at++];
+    if(id === 0) {
+        const length = bytes[at] | (bytes[at + 1] << 8);
+        return [new TextDecoder().decode(bytes.subarray(at + 2, at + 2 + length)), at + 2 + length];
+    }
+    const text = wire.templates[id].replace(/\{([CN])\}/g, (_, kind) => {
+        const value = bytes[at++];
+        return kind === 'C' ? wire.colors[value].toUpperCase() : String(value);
+    });
+    return [text, at];
+}
+
+function decodeUpdate(bytes) {
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    const full = bytes[0] === 0;
+    const fields = {};
+    const tokens = {};
+    let events = null;
+    let at = 5;
+    const color = (value) => value === 255 ? null : wire.colors[value];
+    while(at < bytes.length) {
+        const field = bytes[at++];
+        if(field === 3) {
+            const count = bytes[at++];
+            fields.active_colors = Array.from(bytes.subarray(at, at + count), color);
+            at += count;
+        } else if(field === 8) {
+            [fields.log, at] = decodeLog(bytes, at);
+        } else if(field === 10) {
+            const length = bytes[at++];
+            fields.room_code = new TextDecoder().decode(bytes.subarray(at, at + length)) || null;
+            at += length;
+        } else if(field === 12) {
+            tokens[wire.colors[bytes[at]]] = [1, 2, 3, 4].map(i => view.getInt8(at + i));
+            at += 5;
+        } else if(field === 13) {
+            events = [];
+            for(let count = bytes[at++]; count > 0; count--) {
+                let text;
+                [text, at] = decodeLog(bytes, at);
+                events.push(text);
+            }
+        } else {
+            const value = bytes[at++];
+            if(field === 1) fields.mode = wire.modes[value];
+            else if(field === 2) fields.num_players = value;
+            else if(field === 4) fields.user_color = color(value);
+            else if(field === 5) fields.turn = color(value);
+            else if(field === 6) fields.rolled_value = value || null;
+            else if(field === 7) fields.can_move = value === 1;
+            else if(field === 9) fields.game_started = value === 1;
+            else if(field === 11) fields.connected_players = value;
+        }
+    }
+    const msg = {seq: view.getUint32(1, true)};
+    if(full) {
+        fields.players = {};
+        Object.entries(tokens).forEach(([c, list]) => { fields.players[c] = {tokens: list, path_start: wire.path_start[c]}; });
+        fields.turn_order = fields.active_colors;
+        msg.full = fields;
+    } else {
+        if(Object.keys(tokens).length) fields.tokens = tokens;
+        msg.patch = fields;
+    }
+    if(events) msg.events = events;
+    return msg;
+}
+
+// Several log lines can share one coalesced update; play them in order
+function showEvents(events) {
+    const log = document.getElementById('status-log');
+    events.forEach((text, i) => {
+        setTimeout(() => { log.innerText = text; }, i * 600);
+    });
+}
+
+function renderState(state) {
+    console.log('📊 STATE UPDATE:', state.log);
+
+    document.getElementById('status-log').innerText = state.log;
+
+    ['red','green','yellow','blue'].forEach(color => {
+        const yard = document.querySelector(`.yard.${color}`);
+        const box = document.getElementById(`box-${color}`);
+        const dice = document.getElementById(`dice-${color}`);
+
+        yard.classList.toggle('inactive', !state.active_colors.includes(color));
+        box.classList.remove('active','bot');
+        dice.innerText = '-';
+
+        if(state.turn === color && state.active_colors.includes(color)) {
+            box.classList.add('active');
+            if(state.rolled_value !== null) {
+                dice.innerText = state.rolled_value;
+            } else {
+                dice.innerText = (gameMode === 'computer' && color !== state.user_color) ? '🤖' : '🎲';
+            }
+            if(gameMode === 'computer' && color !== state.user_color) {
+                box.classList.add('bot');
+            }
+        }
+    });
+
+    document.querySelectorAll('.token').forEach(e => e.remove());
+
+    ['red','green','yellow','blue'].forEach(color => {
+        if(!state.active_colors.includes(color)) return;
+
+        state.players[color].tokens.forEach((pos, idx) => {
+            if(pos === 99) return;
+
+            let token = document.createElement('div');
+            token.className = `token ${color}`;
+
+            if(state.turn === color && state.can_move && 
+               (gameMode === 'multiplayer' || color === state.user_color || !isOnlineMode)) {
+                const roll = state.rolled_value;
+                if((pos === -1 && roll === 6) || (pos >= 0 && pos + roll <= 57)) {
+                    token.classList.add('movable');
+                    token.onclick = () => {
+                        console.log(`🎯 Token ${idx} clicked. Room: ${currentRoomCode}`);
+                        moveToken(idx);
+                    };
+                }
+            }
+
+            if(pos === -1) {
+                document.getElementById(`yard-${color}`).appendChild(token);
+            } else if(pos >= 52) {
+                let step = pos - 52;
+                let coords = homePaths[color][step];
+                if(coords) {
+                    const cell = document.getElementById(`cell-${coords[0]}-${coords[1]}`);
+                    if(cell) cell.appendChild(token);
+                }
+            } else {
+                let actualIdx = (state.players[color].path_start + pos) % 52;
+                let coords = pathCoords[actualIdx];
+                if(coords) {
+                    const cell = document.getElementById(`cell-${coords[0]}-${coords[1]}`);
+                    if(cell) cell.appendChild(token);
+                }
+            }
+        });
+    });
+}
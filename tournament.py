@@ -0,0 +1,120 @@
+"""Bot-vs-bot tournament: which move policy wins more, and how fast do games run?
+
+Entrants are move policies: the original heuristic, a random mover, and
+the search levels from bots.py. Seats follow handle_start_game: two
+player games alternate the red/yellow and green/blue pairings, four
+player games use every color. Entrants are rotated through the seats so
+nobody keeps the first roll, and games are spread over every core.
+
+    python tournament.py heuristic random --games 20000
+    python tournament.py medium heuristic --players 4 --games 2000
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import random
+import time
+
+import bots
+import engine
+
+POLICIES = ('heuristic', 'random') + tuple(level for level, settings in bots.LEVELS.items() if settings)
+
+LAYOUTS = {
+    2: [('red', 'yellow'), ('green', 'blue')],
+    4: [tuple(engine.COLORS)],
+}
+
+
+def make_policy(name):
+    if name == 'heuristic':
+        return engine.heuristic_move
+    if name == 'random':
+        return engine.random_move
+    return bots.policy(name)
+
+
+def seating(game, players, entrants):
+    """color -> entrant index for the game-th game"""
+    layouts = LAYOUTS[players]
+    colors = layouts[game % len(layouts)]
+    shift = (game // len(layouts)) % len(entrants)
+    return {color: (seat + shift) % len(entrants) for seat, color in enumerate(colors)}
+
+
+def play_chunk(players, entrants, first, count, seed, max_turns):
+    """Play games first .. first+count-1; returns (wins per entrant, turns, unfinished)"""
+    rng = random.Random(seed)
+    policies = [make_policy(name) for name in entrants]
+    wins = Counter()
+    turns = 0
+    unfinished = 0
+    for game in range(first, first + count):
+        seats = seating(game, players, entrants)
+        winner, length = engine.play_game(list(seats), {c: policies[e] for c, e in seats.items()}, rng, max_turns)
+        if winner is None:
+            unfinished += 1
+            continue
+        wins[seats[winner]] += 1
+        turns += length
+    return wins, turns, unfinished
+
+
+def wilson(wins, games, z=1.96):
+    """95% Wilson score interval for a win rate"""
+    if not games:
+        return 0.0, 0.0
+    rate = wins / games
+    centre = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return centre - spread, centre + spread
+
+
+def run(entrants, players=2, games=1000, workers=None, chunk=None, seed=None, max_turns=10000):
+    """Play the tournament; returns (wins per entrant index, total turns, unfinished)"""
+    workers = workers or os.cpu_count() or 1
+    chunk = chunk or max(1, min(500, games // (workers * 4) or 1))
+    seed = seed if seed is not None else random.getrandbits(32)
+    wins = Counter()
+    turns = 0
+    unfinished = 0
+    with ProcessPoolExecutor(workers) as pool:
+        jobs = [pool.submit(play_chunk, players, entrants, first, min(chunk, games - first),
+                            seed + first, max_turns)
+                for first in range(0, games, chunk)]
+        for job in jobs:
+            chunk_wins, chunk_turns, chunk_unfinished = job.result()
+            wins.update(chunk_wins)
+            turns += chunk_turns
+            unfinished += chunk_unfinished
+    return wins, turns, unfinished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ludo bot-vs-bot tournament")
+    parser.add_argument('entrants', nargs='+', choices=POLICIES)
+    parser.add_argument('--players', type=int, choices=(2, 4), default=2)
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument('--chunk', type=int, default=None, help="games per job")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    if len(args.entrants) > args.players:
+        parser.error(f"at most {args.players} entrants for {args.players} players")
+
+    started = time.perf_counter()
+    wins, turns, unfinished = run(args.entrants, args.players, args.games, args.workers, args.chunk, args.seed)
+    elapsed = time.perf_counter() - started
+    played = args.games - unfinished
+
+    print(f"🏆 {args.games} games, {args.players} players, {elapsed:.2f}s ({args.games / elapsed:,.1f} games/s)")
+    for i, name in enumerate(args.entrants):
+        low, high = wilson(wins[i], played)
+        print(f"  {name:<10} {wins[i] / max(played, 1):7.2%}  (95% CI {low:.2%} - {high:.2%})")
+    print(f"  avg rolls per game: {turns / max(played, 1):.1f}, unfinished: {unfinished}")
+
+
+if __name__ == '__main__':
+    main()
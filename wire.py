@@ -0,0 +1,203 @@
+"""Compact binary encoding of update_state for clients that opt in.
+
+JSON updates repeat long keys ('rolled_value', 'active_colors', ...) and
+emoji log text in every message. A client that connects with
+auth={'wire': 'bin'} gets 'update_bin' instead: the same update packed as
+
+    kind  B (0 full, 1 patch)   seq  I   then fields as  id  B  +  value
+
+with colors as one byte (index into COLORS, 255 for none), token positions
+as four signed bytes per color, and log lines as a template id plus its
+arguments. The templates are sent once in 'wire_hello' at connect, along
+with the color and mode tables and each color's path start, so the client
+expands them itself; a line no template matches is sent as text.
+Everyone else keeps getting JSON exactly as before.
+
+Binary clients send actions as a two-byte 'act' packet (op, token); the
+room is the one their session is in.
+"""
+from functools import lru_cache
+import re
+import struct
+
+from engine import COLORS, COLOR_INDEX
+
+NO_COLOR = 255
+MODES = (None, 'computer', 'multiplayer')
+
+FULL, PATCH = 0, 1
+(F_MODE, F_NUM_PLAYERS, F_ACTIVE, F_USER, F_TURN, F_ROLLED, F_CAN_MOVE, F_LOG, F_STARTED,
+ F_ROOM, F_CONNECTED, F_TOKENS, F_EVENTS) = range(1, 14)
+
+ACT_ROLL, ACT_MOVE, ACT_RESYNC = 1, 2, 3
+
+# {C} is an upper-case color, {N} a small number. Order is the wire id
+# (0 = raw text), so only ever append.
+LOG_TEMPLATES = [
+    None,
+    "Waiting for game to start...",
+    "🎮 {C}'s TURN - CLICK DICE TO ROLL!",
+    "🎲 {C} ROLLED {N}!",
+    "🎲 {C} ROLLED {N}! ✅ CLICK A TOKEN TO MOVE!",
+    "🎲 {C} ROLLED {N}! ❌ NO VALID MOVES!",
+    "🚀 {C} BROUGHT TOKEN OUT!",
+    "🎯 {C} MOVED!",
+    "⚔️ {C} CAPTURED {C}!",
+    "🏆 {C} WINS! 🎉🎉🎉",
+    "🔄 {C} GETS EXTRA TURN!",
+    "👉 {C}'s TURN - CLICK DICE TO ROLL!",
+    "♻️ GAME RESTORED - {C} ROLLED {N}, CLICK A TOKEN TO MOVE!",
+    "♻️ GAME RESTORED - {C}'s TURN - CLICK DICE TO ROLL!",
+    "❌ {C} player disconnected",
+    "✅ {C} player joined! ({N}/{N})",
+]
+
+_COLOR_RE = '(' + '|'.join(c.upper() for c in COLORS) + ')'
+
+
+def _pattern(template):
+    parts = re.split(r'(\{[CN]\})', template)
+    return re.compile(''.join(_COLOR_RE if p == '{C}' else r'(\d+)' if p == '{N}' else re.escape(p)
+                              for p in parts) + '$'), [p[1] for p in parts if p in ('{C}', '{N}')]
+
+
+_PATTERNS = [(i, *_pattern(t)) for i, t in enumerate(LOG_TEMPLATES) if t]
+
+
+@lru_cache(maxsize=4096)
+def encode_log(text):
+    """Template id + one byte per argument, or 0 + length-prefixed UTF-8"""
+    for template_id, pattern, kinds in _PATTERNS:
+        match = pattern.match(text)
+        if match:
+            args = [COLOR_INDEX[v.lower()] if kind == 'C' else int(v) for kind, v in zip(kinds, match.groups())]
+            if all(0 <= a < 256 for a in args):
+                return bytes([template_id, *args])
+    raw = text.encode()
+    return b'\x00' + struct.pack('<H', len(raw)) + raw
+
+
+def _color(color):
+    return COLOR_INDEX[color] if color else NO_COLOR
+
+
+def _tokens(color, tokens):
+    return bytes([F_TOKENS, COLOR_INDEX[color]]) + struct.pack('<4b', *tokens)
+
+
+def encode_update(update):
+    """Pack an update_state payload ({'seq', 'full'|'patch', 'events'?})"""
+    full = update.get('full')
+    fields = full if full is not None else update['patch']
+    out = bytearray(struct.pack('<BI', FULL if full is not None else PATCH, update['seq']))
+    for name, value in fields.items():
+        if name == 'mode':
+            out += bytes([F_MODE, MODES.index(value) if value in MODES else 0])
+        elif name == 'num_players':
+            out += bytes([F_NUM_PLAYERS, value])
+        elif name == 'active_colors':
+            out += bytes([F_ACTIVE, len(value), *(COLOR_INDEX[c] for c in value)])
+        elif name == 'user_color':
+            out += bytes([F_USER, _color(value)])
+        elif name == 'turn':
+            out += bytes([F_TURN, _color(value)])
+        elif name == 'rolled_value':
+            out += bytes([F_ROLLED, value or 0])
+        elif name == 'can_move':
+            out += bytes([F_CAN_MOVE, 1 if value else 0])
+        elif name == 'game_started':
+            out += bytes([F_STARTED, 1 if value else 0])
+        elif name == 'connected_players':
+            out += bytes([F_CONNECTED, value])
+        elif name == 'room_code':
+            raw = (value or '').encode()
+            out += bytes([F_ROOM, len(raw)]) + raw
+        elif name == 'log':
+            out += bytes([F_LOG]) + encode_log(value)
+        elif name == 'tokens':
+            for color, tokens in value.items():
+                out += _tokens(color, tokens)
+        elif name == 'players':
+            for color, player in value.items():
+                out += _tokens(color, player['tokens'])
+        # turn_order is active_colors again; the client rebuilds it
+    events = update.get('events')
+    if events:
+        out += bytes([F_EVENTS, len(events)])
+        for text in events:
+            out += encode_log(text)
+    return bytes(out)
+
+
+def decode_log(data, offset):
+    template_id = data[offset]
+    if template_id == 0:
+        length, = struct.unpack_from('<H', data, offset + 1)
+        return data[offset + 3:offset + 3 + length].decode(), offset + 3 + length
+    template = LOG_TEMPLATES[template_id]
+    parts = re.split(r'(\{[CN]\})', template)
+    offset += 1
+    text = []
+    for part in parts:
+        if part in ('{C}', '{N}'):
+            value = data[offset]
+            offset += 1
+            text.append(COLORS[value].upper() if part == '{C}' else str(value))
+        else:
+            text.append(part)
+    return ''.join(text), offset
+
+
+def decode_update(data):
+    """Inverse of encode_update(); the reference for the browser's decoder"""
+    kind, seq = struct.unpack_from('<BI', data)
+    offset = 5
+    fields = {}
+    tokens = {}
+    events = None
+    while offset < len(data):
+        field = data[offset]
+        offset += 1
+        if field in (F_MODE, F_NUM_PLAYERS, F_USER, F_TURN, F_ROLLED, F_CAN_MOVE, F_STARTED, F_CONNECTED):
+            value = data[offset]
+            offset += 1
+            if field == F_MODE:
+                fields['mode'] = MODES[value]
+            elif field == F_NUM_PLAYERS:
+                fields['num_players'] = value
+            elif field in (F_USER, F_TURN):
+                fields['user_color' if field == F_USER else 'turn'] = COLORS[value] if value != NO_COLOR else None
+            elif field == F_ROLLED:
+                fields['rolled_value'] = value or None
+            elif field == F_CONNECTED:
+                fields['connected_players'] = value
+            else:
+                fields['can_move' if field == F_CAN_MOVE else 'game_started'] = bool(value)
+        elif field == F_ACTIVE:
+            count = data[offset]
+            fields['active_colors'] = [COLORS[c] for c in data[offset + 1:offset + 1 + count]]
+            offset += 1 + count
+        elif field == F_ROOM:
+            length = data[offset]
+            fields['room_code'] = data[offset + 1:offset + 1 + length].decode() or None
+            offset += 1 + length
+        elif field == F_LOG:
+            fields['log'], offset = decode_log(data, offset)
+        elif field == F_TOKENS:
+            tokens[COLORS[data[offset]]] = list(struct.unpack_from('<4b', data, offset + 1))
+            offset += 5
+        elif field == F_EVENTS:
+            count = data[offset]
+            offset += 1
+            events = []
+            for _ in range(count):
+                text, offset = decode_log(data, offset)
+                events.append(text)
+        else:
+            raise ValueError(f"unknown field {field}")
+    if tokens:
+        fields['tokens'] = tokens
+    update = {'seq': seq, 'full' if kind == FULL else 'patch': fields}
+    if events:
+        update['events'] = events
+    return update